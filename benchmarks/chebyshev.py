@@ -0,0 +1,123 @@
+"""
+Compara o avaliador de Chebyshev com o Skyfield em vetores de tempo longos.
+
+Para cada tamanho, mede as posições astrométrica e aparente do Sol e da Lua
+vistos da Terra pelos dois caminhos e a maior diferença entre elas. Confere
+também um corpo com vários segmentos avaliado em instantes de um só
+segmento, e termina com código 1 se alguma diferença passar de
+``--tolerance`` km.
+
+Uso::
+
+    python benchmarks/chebyshev.py [--sizes 1000 100000 525600] [--repeat 3]
+        [--tolerance 1e-3]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, (ROOT / "src").as_posix())
+
+from astroufcg.chebyshev import ChebyshevKernel, Segment
+from astroufcg.ephemeris import default_ephemeris
+
+
+def best_of(function, repeat):
+    """Menor tempo de ``repeat`` execuções e o resultado da última."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 525600])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=1e-3)
+    args = parser.parse_args(argv)
+
+    ephem = default_ephemeris()
+    kernel = ephem.chebyshev
+    segment = kernel.segments[10][0]
+    # Intervalo coberto pelo kernel, em data juliana TDB, com folga de um dia
+    first = 2451545.0 + segment.start / 86400.0 + 1
+    last = 2451545.0 + segment.end / 86400.0 - 1
+
+    worst = 0.0
+    for size in args.sizes:
+        t = ephem.ts.tdb_jd(np.linspace(first, last, size))
+        for name, body in (("sun", ephem.sol), ("moon", ephem.lua)):
+            for kind in ("astrometric", "apparent"):
+                skyfield_time, expected = best_of(
+                    lambda t=t, body=body, kind=kind: observe(ephem, t, body, kind),
+                    args.repeat,
+                )
+                kernel_time, result = best_of(
+                    lambda t=t, name=name, kind=kind: getattr(kernel, kind)(
+                        name, "earth", t
+                    ),
+                    args.repeat,
+                )
+                error = np.abs(result - expected).max()
+                worst = max(worst, error)
+                print(
+                    f"{size:8d} {name:5s} {kind:11s}  skyfield {skyfield_time:7.3f} s  "
+                    f"chebyshev {kernel_time:7.3f} s  "
+                    f"({skyfield_time / kernel_time:5.1f}x)  erro máx. {error:.1e} km"
+                )
+
+    # Um corpo em dois segmentos consultado só nos instantes do primeiro
+    split = split_kernel(kernel, 10)
+    t = ephem.ts.tdb_jd(np.linspace(first, first + 1, 10))
+    error = np.abs(
+        split.astrometric("sun", "earth", t) - kernel.astrometric("sun", "earth", t)
+    ).max()
+    worst = max(worst, error)
+    print(f"\nsegmentos divididos, instantes em um só: erro máx. {error:.1e} km")
+    return 0 if worst <= args.tolerance else 1
+
+
+def observe(ephem, t, body, kind):
+    """Posição do Skyfield, astrométrica ou aparente, em km."""
+    position = ephem.terra.at(t).observe(body)
+    if kind == "apparent":
+        position = position.apparent()
+    return position.position.km
+
+
+def split_kernel(kernel, code):
+    """Cópia de ``kernel`` com os segmentos de ``code`` divididos ao meio."""
+    split = ChebyshevKernel.__new__(ChebyshevKernel)
+    split.file = kernel.file
+    split.segments = dict(kernel.segments)
+    pieces = []
+    for segment in kernel.segments[code]:
+        half = len(segment.coefficients) // 2
+        middle = segment.init + half * segment.intlen
+        pieces.append(
+            segment._replace(end=middle, coefficients=segment.coefficients[:half])
+        )
+        pieces.append(
+            Segment(
+                segment.center,
+                middle,
+                segment.end,
+                middle,
+                segment.intlen,
+                segment.coefficients[half:],
+            )
+        )
+    split.segments[code] = pieces
+    return split
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Mede o executor de Eratóstenes e confere o raio estimado por pares de locais.
+
+Roda :func:`run_experiments` sobre pares fixos, incluindo pares em lados
+opostos da latitude subsolar (o Sol ao sul do zênite num local e ao norte
+no outro), e termina com código 1 se algum raio se afastar mais de
+``--tolerance`` km do raio médio da Terra. Depois mede o tempo para
+``--pairs`` pares sorteados.
+
+Uso::
+
+    python benchmarks/eratostenes.py [--year -200] [--pairs 2000] [--tolerance 50]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, (ROOT / "src").as_posix())
+
+from astroufcg.grecia.eratostenes import run_experiments
+
+MEAN_EARTH_RADIUS_KM = 6371.0
+
+# (nome, lat_01, lon_01, lat_02, lon_02)
+PAIRS = [
+    ("Alexandria-Assuã", 31.2, 29.9, 24.09, 32.9),
+    ("Alexandria-10°N", 31.2, 29.9, 10.0, 29.9),
+    ("Alexandria-Natal", 31.2, 29.9, -5.79, -35.2),
+    ("Assuã-Luanda", 24.09, 32.9, -8.84, 13.23),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--year", type=int, default=-200)
+    parser.add_argument("--pairs", type=int, default=2000)
+    parser.add_argument("--tolerance", type=float, default=50.0)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    names, *coordinates = zip(*PAIRS)
+    fixed = pd.DataFrame(
+        dict(zip(["lat_01", "lon_01", "lat_02", "lon_02"], coordinates)),
+    ).assign(year=args.year)
+    result = run_experiments(fixed, workers=args.workers)
+
+    worst = 0.0
+    for name, radius in zip(names, result["radius_km"]):
+        error = abs(radius - MEAN_EARTH_RADIUS_KM)
+        worst = max(worst, error if np.isfinite(error) else np.inf)
+        print(f"{name:20s}  raio {radius:9.1f} km  erro {error:7.1f} km")
+
+    rng = np.random.default_rng(0)
+    random = pd.DataFrame(
+        {
+            "lat_01": rng.uniform(-60, 60, args.pairs),
+            "lon_01": rng.uniform(-180, 180, args.pairs),
+            "lat_02": rng.uniform(-60, 60, args.pairs),
+            "lon_02": rng.uniform(-180, 180, args.pairs),
+            "year": args.year,
+        }
+    )
+    start = time.perf_counter()
+    run_experiments(random, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"\n{args.pairs} pares em {elapsed:.2f} s")
+    return 0 if worst <= args.tolerance else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Mede o tempo de importação a frio de cada módulo do pacote.
+
+Cada módulo é importado em um interpretador novo; o script termina com
+código 1 se algum módulo ultrapassar o orçamento (em segundos) ou não
+puder ser importado.
+
+Uso::
+
+    python benchmarks/import_time.py [--repeat 3] [--scale 1.0]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Orçamento de importação, em segundos, por módulo.
+BUDGETS = {
+    "astroufcg": 0.05,
+    "astroufcg.cache": 0.1,
+    "astroufcg.ephemeris": 0.1,
+    "astroufcg.geocoding": 0.1,
+    "astroufcg.excerpts": 0.1,
+    "astroufcg.chebyshev": 0.2,
+    "astroufcg.astronomy": 1.5,
+    "astroufcg.shadows": 1.0,
+    "astroufcg.grecia": 0.05,
+    "astroufcg.grecia.eratostenes": 2.0,
+    "astroufcg.grecia.aristarco": 1.0,
+    "astroufcg.medidas_historicas.astronomy": 1.5,
+    "astroufcg.medidas_historicas.eratostenes": 2.0,
+    "astroufcg.astro.utils_POLIASTRO": 6.0,
+    "utils.timeline": 1.0,
+}
+
+SNIPPET = """
+import sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+
+def measure(module, repeat=3):
+    """
+    Importa ``module`` em ``repeat`` processos novos.
+
+    :return: Mediana do tempo de importação, em segundos, ou a mensagem de
+        erro se o módulo não puder ser importado.
+    """
+    code = SNIPPET.format(src=(ROOT / "src").as_posix(), module=module)
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            cwd="/",
+            check=False,
+        )
+        if result.returncode != 0:
+            return result.stderr.strip().splitlines()[-1]
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="fator aplicado aos orçamentos"
+    )
+    parser.add_argument("modules", nargs="*", default=list(BUDGETS))
+    args = parser.parse_args(argv)
+
+    failed = []
+    for module in args.modules:
+        budget = BUDGETS.get(module, 1.0) * args.scale
+        elapsed = measure(module, args.repeat)
+        if isinstance(elapsed, str):
+            print(f"{module:45s}  ERRO ({elapsed})")
+            failed.append(module)
+            continue
+        status = "ok" if elapsed <= budget else "ESTOUROU"
+        print(f"{module:45s} {elapsed:7.3f} s  (orçamento {budget:.2f} s)  {status}")
+        if elapsed > budget:
+            failed.append(module)
+
+    if failed:
+        print(
+            f"\n{len(failed)} módulo(s) com erro ou acima do orçamento: "
+            f"{', '.join(failed)}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Compara a rotação TEME→GCRS pré-calculada com a cadeia de frames do astropy.
+
+Para cada tamanho, propaga a ISS pelo SGP4, converte os vetores TEME em
+GCRS pelos dois caminhos e mede o tempo e a maior diferença. Termina com
+código 1 se a diferença de posição passar de ``--tolerance`` mm.
+
+Uso::
+
+    python benchmarks/teme_gcrs.py [--sizes 1000 20000] [--days 14] [--tolerance 1]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, (ROOT / "src").as_posix())
+
+from astropy import units as u
+from astropy.coordinates import (
+    GCRS,
+    TEME,
+    CartesianDifferential,
+    CartesianRepresentation,
+)
+from astropy.time import Time
+from sgp4.api import Satrec
+
+from astroufcg.astro.utils_POLIASTRO import teme_to_gcrs
+
+# ISS, elementos de 1º de janeiro de 2024
+TLE = (
+    "1 25544U 98067A   24001.50000000  .00016717  00000-0  10270-3 0  9005",
+    "2 25544  51.6416 247.4627 0006703 130.5360 325.0288 15.49815308432652",
+)
+
+
+def astropy_gcrs(r, v, times):
+    teme = CartesianRepresentation(
+        r << u.km,
+        xyz_axis=-1,
+        differentials=CartesianDifferential(v << (u.km / u.s), xyz_axis=-1),
+    )
+    gcrs = TEME(teme, obstime=times).transform_to(GCRS(obstime=times)).cartesian
+    return (
+        gcrs.xyz.to_value(u.km).T,
+        gcrs.differentials["s"].d_xyz.to_value(u.km / u.s).T,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 20000])
+    parser.add_argument("--days", type=float, default=14)
+    parser.add_argument("--tolerance", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    satellite = Satrec.twoline2rv(*TLE)
+    worst = 0.0
+    for size in args.sizes:
+        times = Time("2024-01-01T12:00", scale="tdb") + np.linspace(
+            0, args.days, size
+        ) * u.day
+        _, r, v = satellite.sgp4_array(times.jd1, times.jd2)
+
+        start = time.perf_counter()
+        expected_r, expected_v = astropy_gcrs(r, v, times)
+        astropy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        result_r, result_v = teme_to_gcrs(r, times, v)
+        fast_time = time.perf_counter() - start
+
+        error_r = np.abs(result_r - expected_r).max() * 1e6  # mm
+        error_v = np.abs(result_v - expected_v).max() * 1e6  # mm/s
+        worst = max(worst, error_r)
+        print(
+            f"{size:8d}  astropy {astropy_time:7.3f} s  rotação {fast_time:7.3f} s  "
+            f"({astropy_time / fast_time:6.1f}x)  "
+            f"erro máx. {error_r:.3f} mm, {error_v:.3f} mm/s"
+        )
+    return 0 if worst <= args.tolerance else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
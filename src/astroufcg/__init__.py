@@ -0,0 +1,27 @@
+"""Material de apoio do curso de Introdução à Astronomia e Astrofísica (UFCG)."""
+
+import importlib
+
+_submodules = {
+    "astro",
+    "astronomy",
+    "cache",
+    "chebyshev",
+    "ephemeris",
+    "excerpts",
+    "geocoding",
+    "grecia",
+    "medidas_historicas",
+    "shadows",
+}
+
+
+def __getattr__(name):
+    """Importa os submódulos apenas quando acessados."""
+    if name in _submodules:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted([*globals(), *_submodules])
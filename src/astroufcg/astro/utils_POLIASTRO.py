@@ -1,12 +1,14 @@
 import csv
-from datetime import date, datetime, timedelta
-from functools import partial
+import hashlib
+from datetime import date, datetime
+from functools import lru_cache
 from pathlib import Path
+from types import FunctionType
+from typing import NamedTuple
 from warnings import warn
 
 import numpy as np
 import pandas as pd
-import pytz
 from astropy import constants as const
 from astropy import units as u
 from astropy.coordinates import (
@@ -16,24 +18,19 @@ from astropy.coordinates import (
     CartesianRepresentation,
 )
 from astropy.time import Time
-from astropy.visualization import quantity_support
-from geopy.geocoders import Nominatim
-from matplotlib import pyplot as plt
-from matplotlib.colors import LinearSegmentedColormap
 from poliastro.bodies import Earth, Moon
 from poliastro.constants import GM_earth
-from poliastro.core.perturbations import third_body
-from poliastro.core.propagation import func_twobody
-from poliastro.ephem import Ephem, build_ephem_interpolant
+from poliastro.ephem import Ephem
 from poliastro.frames import Planes
 from poliastro.twobody import Orbit
 from poliastro.twobody.propagation import CowellPropagator
 from poliastro.twobody.sampling import EpochsArray
 from poliastro.util import time_range
-from skyfield.api import EarthSatellite, Loader, load, wgs84
-from timezonefinder import TimezoneFinder
+from skyfield.api import EarthSatellite, Loader, wgs84
 
-quantity_support()
+from ..geocoding import geocode, reverse_geocode, timezone_at
+
+TLE_FOLDER = Path(__file__).resolve().parents[3] / "data" / "TLEs"
 
 spectral_units = {"Wavelength": u.nm, "Flux": u.Unit("W.m^(-2).nm^(-1)")}
 
@@ -47,53 +44,138 @@ l_sun = const.L_sun
 visible_range = [380, 780] * u.nm
 
 
-# Configurar Loader para carregar TLEs
-load = Loader("../../data/TLEs")
-eph = load("de421.bsp")
+@lru_cache(maxsize=1)
+def get_loader():
+    """Retorna o Loader do Skyfield que guarda TLEs e efemérides em ``data/TLEs``."""
+    return Loader(TLE_FOLDER.as_posix())
+
+
+@lru_cache(maxsize=1)
+def get_eph():
+    """Carrega ``de421.bsp`` no primeiro uso."""
+    return get_loader()("de421.bsp")
+
+
+def __getattr__(name):
+    """Expõe ``load`` e ``eph`` sem carregá-los na importação."""
+    if name == "load":
+        return get_loader()
+    if name == "eph":
+        return get_eph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 ## Seção de Coordenadas Celestes - Skyfield
 #------------------------------------------------
+def _as_date(value):
+    if value is None:
+        return date.today()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
 def make_analemma(
     start_date=None, end_date=None, hour=None, location="Campina Grande, PB"
 ):
-    # determina coordenadas da localização com geopy
-    geolocator = Nominatim(user_agent="Aulas")
-    location = geolocator.geocode(location)
-    lat, lon = location.latitude, location.longitude
-    # determina timezone com timezonefinder e pytz
-    tf = TimezoneFinder()
-    tz = pytz.timezone(tf.timezone_at(lng=lon, lat=lat))
+    from zoneinfo import ZoneInfo
+
+    eph = get_eph()
+    ts = get_loader().timescale()
+    # determina coordenadas da localização pelo gazetteer/cache local
+    lat, lon = geocode(location)
+    # determina timezone pelo resolvedor compartilhado; o deslocamento do
+    # primeiro dia vale para todo o período
+    tz = ZoneInfo(timezone_at(lat, lon))
+    start = _as_date(start_date)
+    offset = datetime.combine(start, datetime.min.time(), tzinfo=tz).utcoffset()
     # Observador
-    earth = eph["earth"]
-    observer = earth + wgs84.latlon(lat, lon)
-    # Time range
-    if hour is None:
-        hour = 12
-    hour = timedelta(hours=hour)
-    if start_date is None:
-        start_date = tz.localize(datetime.combine(date.today(), datetime.min.time()))
-    else:
-        start_date = tz.localize(date.fromisoformat(start_date))
-    start_date = (start_date + hour).astimezone(pytz.UTC)
-    if end_date is None:
-        n_days = 365
-    else:
-        n_days = (end_date - start_date).days
-    ts = load.timescale()
-    _times = [start_date + timedelta(days=i) for i in range(n_days)]
-    times = ts.from_datetimes(_times)
+    observer = eph["earth"] + wgs84.latlon(lat, lon)
+    # Time range, direto como array, sem lista de datetimes
+    hour = 12 if hour is None else hour
+    n_days = 365 if end_date is None else (_as_date(end_date) - start).days
+    times = ts.utc(
+        start.year,
+        start.month,
+        start.day + np.arange(n_days),
+        hour - offset.total_seconds() / 3600,
+    )
 
-    sun = eph["sun"]
-    observations = observer.at(times).observe(sun).apparent()
+    observations = observer.at(times).observe(eph["sun"]).apparent()
     return observations
 
 
+ANALEMMA_DTYPE = np.dtype(
+    [
+        ("site", "i4"),
+        ("hour", "f4"),
+        ("day", "i4"),
+        ("jd_tt", "f8"),
+        ("alt", "f4"),
+        ("az", "f4"),
+        ("ra", "f4"),
+        ("dec", "f4"),
+    ]
+)
+
+
+def make_analemmas(
+    lats, lons, hours=12, start_date=None, n_days=365, utc_offsets=None, eph=None
+):
+    """
+    Analemas de vários locais e horas do dia em uma única avaliação.
+
+    Os instantes de todos os pares (local, hora, dia) são gerados como um
+    único array e o Sol é observado de todos os locais de uma vez.
+
+    :param lats: Latitudes dos locais em graus.
+    :param lons: Longitudes dos locais em graus.
+    :param hours: Hora(s) locais do dia.
+    :param start_date: Primeiro dia ('YYYY-MM-DD' ou ``date``); hoje se None.
+    :param n_days: Número de dias.
+    :param utc_offsets: Fuso de cada local, em horas. Se None, usa o tempo
+        solar médio local (longitude / 15).
+    :param eph: Efeméride do Skyfield; se None, usa ``de421.bsp``.
+    :return: Array estruturado ``(n_locais, n_horas, n_dias)`` com os campos
+        de ``ANALEMMA_DTYPE``: índices, data juliana TT, altura e azimute, e
+        ascensão reta e declinação (ICRS), todos em graus.
+    """
+    eph = eph or get_eph()
+    ts = get_loader().timescale()
+    lat = np.atleast_1d(np.asarray(lats, dtype=float))
+    lon = np.atleast_1d(np.asarray(lons, dtype=float))
+    hours = np.atleast_1d(np.asarray(hours, dtype=float))
+    if utc_offsets is None:
+        offsets = lon / 15.0
+    else:
+        offsets = np.broadcast_to(np.asarray(utc_offsets, dtype=float), lat.shape)
+    start = _as_date(start_date)
+
+    site, hour, day = np.meshgrid(
+        np.arange(lat.size), hours, np.arange(n_days), indexing="ij"
+    )
+    site, hour, day = site.ravel(), hour.ravel(), day.ravel()
+    times = ts.utc(start.year, start.month, start.day + day, hour - offsets[site])
+    observer = eph["earth"] + wgs84.latlon(lat[site], lon[site])
+    apparent = observer.at(times).observe(eph["sun"]).apparent()
+    alt, az, _ = apparent.altaz()
+    ra, dec, _ = apparent.radec()
+
+    result = np.empty(site.size, dtype=ANALEMMA_DTYPE)
+    result["site"], result["hour"], result["day"] = site, hour, day
+    result["jd_tt"] = times.tt
+    result["alt"], result["az"] = alt.degrees, az.degrees
+    result["ra"], result["dec"] = ra.hours * 15, dec.degrees
+    return result.reshape(lat.size, hours.size, n_days)
+
+
 def plot_analemma(observations, coordinates="horizontal", ax=None):
-    geolocator = Nominatim(user_agent="Aulas")
-    geocode = partial(geolocator.geocode, language="es")
-    location = geolocator.reverse((observations.center.latitude.degrees, observations.center.longitude.degrees), exactly_one=True, language="pt")
-    local = location.raw["address"].get("city")
+    from matplotlib import pyplot as plt
+    from matplotlib.colors import LinearSegmentedColormap
+
+    local = reverse_geocode(
+        observations.center.latitude.degrees, observations.center.longitude.degrees
+    )["city"]
     MONTH_NAMES = "0 Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split()
 
     if coordinates == "horizontal":
@@ -148,7 +230,7 @@ def get_timestamp_idx(times, target_timestamp, tol=1 * u.min):
     return idx
 
 def make_time_range(object=None, n_days=365, steps_per_day=96):
-    ts = load.timescale()
+    ts = get_loader().timescale()
     if object is None:
         start_date = Time(Time.now().jd, format="jd", scale="tdb")
     else:
@@ -177,11 +259,22 @@ def get_orbital_elements(satellite):
     )
 
 
+CELESTRAK_URL = "https://celestrak.org/NORAD/elements/gp.php?GROUP={group}&FORMAT=csv"
+
+
+def get_catalog_file(group="stations", reload=False):
+    """Baixa (uma vez) o grupo ``group`` da Celestrak em formato OMM/CSV."""
+    load = get_loader()
+    filename = f"{group}.csv"
+    if reload or not load.exists(filename):
+        load.download(CELESTRAK_URL.format(group=group), filename=filename)
+    return Path(load.path_to(filename))
+
+
 def get_sat(object="ISS"):
     # Baixar TLEs mais recentes para a ISS
-    if not Path("../../data/TLEs/stations.csv").exists():
-        url = "https://celestrak.org/NORAD/elements/gp.php?GROUP=stations&FORMAT=csv"
-        load.download(url, filename="../../data/TLEs/stations.csv")
+    load = get_loader()
+    get_catalog_file("stations")
 
     with load.open("stations.csv", mode="r") as f:
         TLEdata = list(csv.DictReader(f))
@@ -190,10 +283,191 @@ def get_sat(object="ISS"):
     satellite = TLEs[TLEs.OBJECT_NAME == "ISS (ZARYA)"].iloc[0, :].to_dict()
     #satellite = EarthSatellite.from_omm(ts, ISS_elems)
     return satellite
-    
 
 
-def ephem_from_skyfield(sat, times):
+class SatelliteCatalog:
+    """
+    Catálogo de satélites propagado em bloco pelo SGP4.
+
+    Os registros OMM são lidos uma única vez e guardados num
+    ``SatrecArray`` do ``sgp4``, que propaga todos os satélites em todos os
+    instantes numa única chamada ao código compilado.
+
+    :param records: Registros OMM (dicionários ou linhas de um DataFrame
+        com as colunas da Celestrak).
+    """
+
+    def __init__(self, records):
+        from sgp4 import omm
+        from sgp4.api import Satrec
+
+        if isinstance(records, pd.DataFrame):
+            records = records.to_dict("records")
+        satellites = []
+        for fields in records:
+            satellite = Satrec()
+            omm.initialize(satellite, {key: str(val) for key, val in fields.items()})
+            satellites.append(satellite)
+        self.satellites = satellites
+        self.names = np.array([fields["OBJECT_NAME"] for fields in records])
+        self.norad_ids = np.array([sat.satnum for sat in satellites])
+        self.epochs = np.array([sat.jdsatepoch + sat.jdsatepochF for sat in satellites])
+
+    @classmethod
+    def from_csv(cls, path):
+        """Lê um arquivo OMM/CSV da Celestrak."""
+        from sgp4 import omm
+
+        with open(path) as f:
+            return cls(list(omm.parse_csv(f)))
+
+    @classmethod
+    def from_group(cls, group="stations", reload=False):
+        """Catálogo de um grupo da Celestrak, como ``"active"`` ou ``"starlink"``."""
+        return cls.from_csv(get_catalog_file(group, reload))
+
+    def __len__(self):
+        return len(self.satellites)
+
+    def __repr__(self):
+        return f"SatelliteCatalog({len(self)} satélites)"
+
+    def propagate(self, times, output=None, chunk_size=512, velocities=False):
+        """
+        Posições TEME de todos os satélites em todos os instantes.
+
+        :param times: Instantes (``astropy.time.Time``).
+        :param output: Se informado, arquivo ``.npy`` mapeado em memória em
+            que as posições são gravadas bloco a bloco.
+        :param chunk_size: Número de satélites propagados por bloco.
+        :param velocities: Se True, retorna também as velocidades (km/s),
+            num segundo array (``<output>_v.npy`` se ``output`` for informado).
+        :return: Array ``(n_satélites, n_instantes, 3)`` em km, com NaN onde
+            o SGP4 falhou (e o array de velocidades, se pedido).
+        """
+        from sgp4.api import SatrecArray
+
+        times = Time(times).utc
+        jd = np.atleast_1d(times.jd1).astype(float)
+        fr = np.atleast_1d(times.jd2).astype(float)
+        shape = (len(self), jd.size, 3)
+        if output is None:
+            positions = np.empty(shape)
+            speeds = np.empty(shape) if velocities else None
+        else:
+            output = Path(output)
+            positions = np.lib.format.open_memmap(output, mode="w+", shape=shape)
+            speeds = None
+            if velocities:
+                speeds = np.lib.format.open_memmap(
+                    output.with_name(f"{output.stem}_v.npy"), mode="w+", shape=shape
+                )
+
+        failed = False
+        for start in range(0, len(self), chunk_size):
+            block = slice(start, start + chunk_size)
+            errors, r, v = SatrecArray(self.satellites[block]).sgp4(jd, fr)
+            bad = errors != 0
+            failed |= bool(bad.any())
+            r[bad] = np.nan
+            positions[block] = r
+            if velocities:
+                v[bad] = np.nan
+                speeds[block] = v
+        if failed:
+            warn(
+                "Some objects could not be propagated, proceeding with the rest",
+                stacklevel=2,
+            )
+        if output is not None:
+            positions.flush()
+            if velocities:
+                speeds.flush()
+        return (positions, speeds) if velocities else positions
+
+
+TEME_GCRS_NODE_STEP = 1 / 24  # dias entre nós da matriz de precessão-nutação
+TEME_GCRS_CACHE_SIZE = 8
+_teme_gcrs_cache = {}
+
+
+def teme_to_gcrs_matrix(times):
+    """
+    Matrizes de rotação TEME→GCRS para uma grade de instantes.
+
+    Equivale à cadeia TEME→ITRS→CIRS→GCRS do astropy, em que o movimento
+    do polo se cancela: a matriz é ``C(t)ᵀ R₃(GMST82 − ERA − s')``, com
+    ``C`` a matriz celeste-intermediária IAU 2006/2000A. ``C`` varia
+    devagar e, em grades densas, é calculada em nós a cada
+    ``TEME_GCRS_NODE_STEP`` dia e interpolada; os ângulos de rotação são
+    calculados em cada instante. A diferença GMST82 − ERA é insensível a
+    UT1 − UTC, e por isso o UTC é usado no lugar do UT1, sem tabelas IERS.
+    As matrizes das últimas grades ficam em cache na memória.
+
+    :param times: Instantes (``astropy.time.Time``).
+    :return: Array ``(n, 3, 3)``.
+    """
+    import erfa
+
+    times = Time(times)
+    key = hashlib.sha256(
+        times.scale.encode()
+        + np.ascontiguousarray(times.jd1, dtype=float).tobytes()
+        + np.ascontiguousarray(times.jd2, dtype=float).tobytes()
+    ).hexdigest()
+    if key in _teme_gcrs_cache:
+        return _teme_gcrs_cache[key]
+
+    if times.scale == "tdb":
+        # TDB − TT < 2 ms, sem efeito nas matrizes; evita o cálculo de dtdb
+        times = Time(times.jd1, times.jd2, format="jd", scale="tt")
+    tt = times.tt
+    utc = tt.utc
+    tt1, tt2 = np.atleast_1d(tt.jd1), np.atleast_1d(tt.jd2)
+    utc1, utc2 = np.atleast_1d(utc.jd1), np.atleast_1d(utc.jd2)
+    jd = tt1 + tt2
+    span = jd.max() - jd.min()
+    n_nodes = int(np.ceil(span / TEME_GCRS_NODE_STEP)) + 1
+    if n_nodes < jd.size:
+        nodes = np.linspace(jd.min(), jd.max(), max(n_nodes, 2))
+        c2i = erfa.c2i06a(nodes, 0.0).reshape(-1, 9)
+        c2i = np.stack([np.interp(jd, nodes, c2i[:, k]) for k in range(9)], axis=-1)
+        c2i = c2i.reshape(-1, 3, 3)
+    else:
+        c2i = erfa.c2i06a(tt1, tt2)
+
+    angle = erfa.gmst82(utc1, utc2) - erfa.era00(utc1, utc2) - erfa.sp00(tt1, tt2)
+    cos, sin = np.cos(angle), np.sin(angle)
+    rotation = np.zeros((jd.size, 3, 3))
+    rotation[:, 0, 0], rotation[:, 0, 1] = cos, sin
+    rotation[:, 1, 0], rotation[:, 1, 1] = -sin, cos
+    rotation[:, 2, 2] = 1.0
+    matrix = np.einsum("nji,njk->nik", c2i, rotation)
+
+    if len(_teme_gcrs_cache) >= TEME_GCRS_CACHE_SIZE:
+        _teme_gcrs_cache.pop(next(iter(_teme_gcrs_cache)))
+    _teme_gcrs_cache[key] = matrix
+    return matrix
+
+
+def teme_to_gcrs(positions, times, velocities=None):
+    """
+    Converte vetores TEME em GCRS com um único produto de matrizes em lote.
+
+    :param positions: Array ``(..., n, 3)``, por exemplo ``(n_satélites,
+        n_instantes, 3)`` de :meth:`SatelliteCatalog.propagate`.
+    :param times: Os ``n`` instantes (``astropy.time.Time``).
+    :param velocities: Velocidades no mesmo formato, opcionais.
+    :return: Posições (e velocidades, se dadas) em GCRS, nas mesmas unidades.
+    """
+    matrix = teme_to_gcrs_matrix(times)
+    positions = np.einsum("nij,...nj->...ni", matrix, positions)
+    if velocities is None:
+        return positions
+    return positions, np.einsum("nij,...nj->...ni", matrix, velocities)
+
+
+def ephem_from_skyfield(sat, times, fast=True):
     errors, rs, vs = sat.model.sgp4_array(times.jd1, times.jd2)
     if not (errors == 0).all():
         warn(
@@ -204,6 +478,16 @@ def ephem_from_skyfield(sat, times):
         vs = vs[errors == 0]
         times = times[errors == 0]
 
+    if fast:
+        # Rotação TEME→GCRS pré-calculada para a grade de instantes
+        rs, vs = teme_to_gcrs(rs, times, vs)
+        cart_gcrs = CartesianRepresentation(
+            rs << u.km,
+            xyz_axis=-1,
+            differentials=CartesianDifferential(vs << (u.km / u.s), xyz_axis=-1),
+        )
+        return Ephem(cart_gcrs, times, plane=Planes.EARTH_EQUATOR)
+
     cart_teme = CartesianRepresentation(
         rs << u.km,
         xyz_axis=-1,
@@ -216,57 +500,333 @@ def ephem_from_skyfield(sat, times):
 
     return Ephem(cart_gcrs, times, plane=Planes.EARTH_EQUATOR)    
 
-def get_ephem_kepler(object, times):
+SAMPLES_PER_ORBIT = 100
+MOON_PERIOD = 27.321661 * u.day  # mês sideral
+
+
+def orbital_period(object):
+    """Período orbital a partir do movimento médio (revoluções por dia) do OMM."""
+    return (1 / float(object["MEAN_MOTION"])) * u.day
+
+
+def sample_epochs(times, sampling=None, period=None):
+    """
+    Instantes em que uma efeméride é calculada, comuns a todos os ``get_ephem_*``.
+
+    :param times: Instantes pedidos, por exemplo de :func:`make_time_range`.
+    :param sampling: Estratégia de amostragem:
+
+        - ``None``: os próprios ``times`` (respeita ``steps_per_day``);
+        - inteiro ``n``: prévia com ``n`` instantes igualmente espaçados
+          entre o primeiro e o último (``1000`` reproduz o comportamento
+          antigo);
+        - ``"adaptive"``: passo de ``period / SAMPLES_PER_ORBIT``;
+        - ``Time``: uma grade já pronta, usada como está, o que permite
+          reaproveitar a mesma grade entre métodos.
+    :param period: Período orbital, obrigatório com ``"adaptive"``.
+    :return: ``astropy.time.Time``.
+    """
+    if sampling is None:
+        return times
+    if isinstance(sampling, Time):
+        return sampling
+    if isinstance(sampling, str):
+        if sampling != "adaptive":
+            raise ValueError(
+                f"Amostragem desconhecida: {sampling!r} (use None, um inteiro, "
+                "'adaptive' ou um Time)."
+            )
+        if period is None:
+            raise ValueError("A amostragem 'adaptive' precisa do período orbital.")
+        span = (times[-1] - times[0]).to_value(u.s)
+        step = (period / SAMPLES_PER_ORBIT).to_value(u.s)
+        periods = max(int(np.ceil(span / step)) + 1, 2)
+    else:
+        periods = int(sampling)
+    return time_range(start=times[0], end=times[-1], periods=periods)
+
+
+def get_ephem_kepler(object, times, sampling=None):
     elements = get_orbital_elements(object)
     orbit = Orbit.from_classical(Earth, *elements, epoch=times[0])
-    epochs = time_range(start=times[0], end=times[-1], periods=1000)
+    epochs = sample_epochs(times, sampling, orbital_period(object))
     ephem = orbit.to_ephem(strategy=EpochsArray(epochs=epochs.tdb))
     return ephem
 
 
        
 
-def get_ephem_sgp4(object, times):
-    ts = load.timescale()
-    _times = ts.from_astropy(times)
+def get_ephem_sgp4(object, times, sampling=None):
+    ts = get_loader().timescale()
     satellite = EarthSatellite.from_omm(ts, object)
-    epochs = time_range(start=times[0], end=times[-1], periods=1000)
+    epochs = sample_epochs(times, sampling, orbital_period(object))
     ephem = ephem_from_skyfield(satellite, epochs)
     return ephem 
 
 
 
 
-def get_ephem_cowell(object, times):
+MOON_TABLE_STEP = 3600.0  # s entre amostras da posição da Lua
+MOON_TABLE_CACHE_SIZE = 4
+_moon_tables = []
+
+
+class MoonTable(NamedTuple):
+    """Posições geocêntricas da Lua (GCRS) amostradas a passo constante."""
+
+    start: Time  # instante da primeira amostra (TDB)
+    step: float  # s entre amostras
+    positions: np.ndarray  # (n, 3) em km
+
+    @property
+    def end(self):
+        return self.start + (len(self.positions) - 1) * self.step * u.s
+
+
+def get_moon_table(start, end, step=MOON_TABLE_STEP):
+    """
+    Tabela da posição da Lua que cobre ``[start, end]``, reutilizada entre chamadas.
+
+    Uma tabela já calculada com o mesmo passo e que cubra o intervalo é
+    devolvida sem recalcular; senão, a Lua é amostrada em dias inteiros com
+    um dia de folga de cada lado, para que propagações vizinhas
+    compartilhem a mesma tabela.
+
+    :param start: Início do intervalo.
+    :param end: Fim do intervalo.
+    :param step: Passo da tabela, em segundos.
+    :return: :class:`MoonTable`.
+    """
+    start, end = Time(start).tdb, Time(end).tdb
+    for table in _moon_tables:
+        if table.step == step and table.start <= start and table.end >= end:
+            return table
+
+    first, last = np.floor(start.jd - 1), np.ceil(end.jd + 1)
+    n = int(round((last - first) * 86400 / step)) + 1
+    epochs = Time(first, format="jd", scale="tdb") + np.arange(n) * step * u.s
+    positions = Ephem.from_body(Moon, epochs, attractor=Earth).sample(epochs)
+    table = MoonTable(epochs[0], step, positions.xyz.to_value(u.km).T.copy())
+
+    if len(_moon_tables) >= MOON_TABLE_CACHE_SIZE:
+        _moon_tables.pop(0)
+    _moon_tables.append(table)
+    return table
+
+
+def _table_position(positions, index):
+    """Interpolação cúbica de Lagrange na tabela, com ``index`` fracionário."""
+    i = min(max(int(np.floor(index)), 1), positions.shape[0] - 3)
+    s = index - i
+    w0 = -s * (s - 1) * (s - 2) / 6
+    w1 = (s + 1) * (s - 1) * (s - 2) / 2
+    w2 = -(s + 1) * s * (s - 2) / 2
+    w3 = (s + 1) * s * (s - 1) / 6
+    return (
+        w0 * positions[i - 1]
+        + w1 * positions[i]
+        + w2 * positions[i + 1]
+        + w3 * positions[i + 2]
+    )
+
+
+def cowell_moon_rhs(t0, state, k, k_moon, positions, offset, step):
+    """
+    Derivada do estado: dois corpos mais a perturbação de terceiro corpo da Lua.
+
+    Mesmo modelo de ``func_twobody`` + ``third_body`` do poliastro, com a
+    Lua lida de uma :class:`MoonTable`. As propagações usam a versão
+    compilada pelo numba (ver :func:`compiled_rhs`).
+
+    :param t0: Segundos desde a época da órbita.
+    :param state: Estado ``(x, y, z, vx, vy, vz)`` em km e km/s.
+    :param k: Parâmetro gravitacional da Terra (km³/s²).
+    :param k_moon: Parâmetro gravitacional da Lua (km³/s²).
+    :param positions: ``MoonTable.positions``.
+    :param offset: Segundos da primeira amostra da tabela até a época da órbita.
+    :param step: ``MoonTable.step``.
+    """
+    moon = _table_position(positions, (t0 + offset) / step)
+    derivative = np.empty(6)
+    derivative[:3] = state[3:]
+    derivative[3:] = _moon_acceleration(state[:3], moon, k, k_moon)
+    return derivative
+
+
+def _moon_acceleration(r, moon, k, k_moon):
+    delta = moon - r
+    return (
+        -k * r / np.linalg.norm(r) ** 3
+        + k_moon * delta / np.linalg.norm(delta) ** 3
+        - k_moon * moon / np.linalg.norm(moon) ** 3
+    )
+
+
+def cowell_moon_rhs_ensemble(t0, states, k, k_moon, positions, offset, step):
+    """
+    :func:`cowell_moon_rhs` para ``n`` estados empilhados num vetor ``(6 n,)``.
+
+    A posição da Lua é interpolada uma única vez por avaliação e vale para
+    todos os membros.
+    """
+    moon = _table_position(positions, (t0 + offset) / step)
+    derivative = np.empty_like(states)
+    for j in range(0, states.size, 6):
+        derivative[j : j + 3] = states[j + 3 : j + 6]
+        derivative[j + 3 : j + 6] = _moon_acceleration(
+            states[j : j + 3], moon, k, k_moon
+        )
+    return derivative
+
+
+class CompiledRHS(NamedTuple):
+    """Derivadas de Cowell compiladas pelo numba."""
+
+    single: object  # cowell_moon_rhs
+    ensemble: object  # cowell_moon_rhs_ensemble
+
+
+@lru_cache(maxsize=1)
+def compiled_rhs():
+    """
+    Compila as derivadas de Cowell com o numba no primeiro uso.
+
+    O numba só é importado aqui, para que importar o módulo não pague a
+    sua inicialização. Cada derivada é compilada a partir de uma cópia cujos
+    únicos nomes globais são ``np`` e as auxiliares já compiladas, e o
+    código de máquina fica no cache em disco do numba.
+
+    :return: :class:`CompiledRHS`.
+    """
+    from numba import njit
+
+    jit = njit(cache=True)
+    names = {
+        "__name__": __name__,
+        "np": np,
+        "_table_position": jit(_table_position),
+        "_moon_acceleration": jit(_moon_acceleration),
+    }
+
+    def rebind(function):
+        return jit(FunctionType(function.__code__, names, function.__name__))
+
+    return CompiledRHS(rebind(cowell_moon_rhs), rebind(cowell_moon_rhs_ensemble))
+
+
+def get_ephem_cowell(object, times, rtol=1e-5, sampling=None):
+    times = sample_epochs(times, sampling, orbital_period(object))
     tofs = times - times[0]
     elements = get_orbital_elements(object)
     orbit = Orbit.from_classical(Earth, *elements, epoch=times[0])
-    body_r = build_ephem_interpolant(
-    Moon,
-    28 * u.day,
-    (times[0] - 2 * u.day, times[-1] + 30 * u.day),
-    rtol=1e-2,
-    )
-    def _f(t0, state, k):
-        du_kep = func_twobody(t0, state, k)
-        ax, ay, az = third_body(
-            t0,
-            state,
-            k,
-            Moon.k.to(u.km**3 / u.s**2).value,
-            perturbation_body=body_r,
-        )
-        du_ad = np.array([0, 0, 0, ax, ay, az])
+    # Tabela da Lua reaproveitada entre propagações que cobrem o mesmo intervalo
+    table = get_moon_table(times[0], times[-1])
+    k_moon = Moon.k.to_value(u.km**3 / u.s**2)
+    offset = (times[0].tdb - table.start).to_value(u.s)
+    rhs = compiled_rhs().single
 
-        return du_kep + du_ad
+    def _f(t0, state, k):
+        return rhs(t0, state, k, k_moon, table.positions, offset, table.step)
 
     ephem = orbit.to_ephem(
-    EpochsArray(times[0] + tofs, method=CowellPropagator(rtol=1e-5, f=_f)),
+        EpochsArray(times[0] + tofs, method=CowellPropagator(rtol=rtol, f=_f)),
     )
     return ephem
 
-def get_moon(times):
-    epochs = time_range(start=times[0], end=times[-1], periods=1000)
+class CowellEnsemble(NamedTuple):
+    """Trajetórias de um conjunto de órbitas nos mesmos instantes (GCRS)."""
+
+    epochs: Time
+    positions: np.ndarray  # (n_membros, n_instantes, 3) em km
+    velocities: np.ndarray  # (n_membros, n_instantes, 3) em km/s
+
+    def ephem(self, member):
+        """``Ephem`` do poliastro para um membro do conjunto."""
+        cart = CartesianRepresentation(
+            self.positions[member] << u.km,
+            xyz_axis=-1,
+            differentials=CartesianDifferential(
+                self.velocities[member] << (u.km / u.s), xyz_axis=-1
+            ),
+        )
+        return Ephem(cart, self.epochs, plane=Planes.EARTH_EQUATOR)
+
+
+def _integrate_ensemble(states, tofs, k, k_moon, table, offset, rtol, atol):
+    """Integra os estados ``(n, 6)`` empilhados; retorna ``(n, n_instantes, 6)``."""
+    from scipy.integrate import solve_ivp
+
+    solution = solve_ivp(
+        compiled_rhs().ensemble,
+        (tofs[0], tofs[-1]),
+        np.ascontiguousarray(states, dtype=float).ravel(),
+        method="DOP853",
+        t_eval=tofs,
+        rtol=rtol,
+        atol=atol,
+        args=(k, k_moon, table.positions, offset, table.step),
+    )
+    if not solution.success:
+        raise RuntimeError(f"Falha na integração do conjunto: {solution.message}")
+    return solution.y.reshape(len(states), 6, -1).transpose(0, 2, 1)
+
+
+def get_ephem_cowell_ensemble(
+    object,
+    times,
+    n_members=100,
+    sigma_r=0.1,
+    sigma_v=1e-4,
+    states=None,
+    rtol=1e-5,
+    atol=1e-12,
+    seed=None,
+    sampling=None,
+):
+    """
+    Propaga um conjunto de órbitas próximas numa única integração de Cowell.
+
+    Os estados iniciais são empilhados num único sistema de ``6 n``
+    equações, integrado pelo DOP853 com o mesmo modelo de
+    :func:`get_ephem_cowell` (dois corpos mais a Lua) e a mesma tabela da
+    Lua para todos os membros. O passo é comum a todos, escolhido pelo
+    membro mais exigente.
+
+    :param object: Registro OMM do satélite (ver :func:`get_sat`).
+    :param times: Instantes de saída; o primeiro é a época dos estados.
+    :param n_members: Número de membros, se ``states`` não for dado. O
+        membro 0 é a órbita nominal; os demais recebem perturbações
+        gaussianas de desvio ``sigma_r`` (km) na posição e ``sigma_v``
+        (km/s) na velocidade.
+    :param states: Estados iniciais ``(n, 6)`` em km e km/s (GCRS), no lugar
+        das perturbações aleatórias.
+    :param seed: Semente do gerador aleatório.
+    :param sampling: Amostragem dos instantes de saída (ver :func:`sample_epochs`).
+    :return: :class:`CowellEnsemble`.
+    """
+    times = sample_epochs(times, sampling, orbital_period(object))
+    elements = get_orbital_elements(object)
+    orbit = Orbit.from_classical(Earth, *elements, epoch=times[0])
+    if states is None:
+        nominal = np.concatenate([orbit.r.to_value(u.km), orbit.v.to_value(u.km / u.s)])
+        rng = np.random.default_rng(seed)
+        noise = rng.normal(size=(n_members, 6)) * np.repeat([sigma_r, sigma_v], 3)
+        noise[0] = 0
+        states = nominal + noise
+    states = np.atleast_2d(np.asarray(states, dtype=float))
+
+    table = get_moon_table(times[0], times[-1])
+    k = Earth.k.to_value(u.km**3 / u.s**2)
+    k_moon = Moon.k.to_value(u.km**3 / u.s**2)
+    offset = (times[0].tdb - table.start).to_value(u.s)
+    tofs = (times - times[0]).to_value(u.s)
+
+    result = _integrate_ensemble(states, tofs, k, k_moon, table, offset, rtol, atol)
+    return CowellEnsemble(times, result[..., :3], result[..., 3:])
+
+
+def get_moon(times, sampling=None):
+    epochs = sample_epochs(times, sampling, MOON_PERIOD)
     ephem = Ephem.from_body(Moon, epochs, attractor=Earth)   
     return ephem
 
@@ -3,110 +3,309 @@ from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from jplephem.daf import DAF
-from jplephem.excerpter import write_excerpt
-from jplephem.spk import SPK
-from skyfield import almanac
-from skyfield.api import load, wgs84
+
+from .cache import DiskCache, file_hash, make_key
+from .ephemeris import (
+    default_ephemeris,
+    get_timescale,
+    set_default_ephemeris,
+)
+from .excerpts import ExcerptCatalog, julian_date, naif_code, write_segments
+
+SUN_DAILY_MOTION = 360.0 / 365.2422  # graus de longitude eclíptica por dia
+NEWTON_TOL = 1e-7  # tolerância das iterações, em dias (~0.01 s)
+NEWTON_MAX_ITER = 10
+MAX_ALT_STEP = 60 / 86400.0  # passo das diferenças centrais, em dias
+TIME_UNITS = {
+    "minutes": 1 / 1440.0,  # 1 minuto em dias
+    "hours": 1 / 24.0,  # 1 hora em dias
+    "days": 1.0,  # 1 dia em dias
+    "seconds": 1 / 86400.0,  # 1 segundo em dias
+}
+
+results_cache = DiskCache("astronomy")
 
 
 def setup(path, ephem_file="data/skyfield/de431_excerpt.bsp"):
     """
     Configura o ambiente para o experimento de Eratóstenes.
 
+    Define a efeméride padrão do processo; o kernel só é carregado no
+    primeiro uso e é compartilhado por todos os módulos.
+
     :param path: Caminho ou URL do arquivo de efeméride.
-    :return: Efeméride carregada.
+    :return: Contexto da efeméride.
     """
 
     # ephem_file = "data/skyfield/de431_excerpt.bsp"
     file = Path(path) / ephem_file if not path.startswith("http") else ephem_file
     if not os.path.exists(file):
         raise FileNotFoundError(f"Arquivo de efeméride não encontrado: {file}")
-    eph = load(file.as_posix())
-    if eph is None:
-        raise ValueError("Não foi possível carregar a efeméride.")
-    ts = load.timescale()
-    terra = eph["earth"]
-    sol = eph["sun"]
-    lua = eph["moon"]
-    globals()["eph"] = eph
-    globals()["ts"] = ts
-    globals()["terra"] = terra
-    globals()["sol"] = sol
-    globals()["lua"] = lua
+    return set_default_ephemeris(file)
+
+
+def __getattr__(name):
+    """Expõe ``eph``, ``ts``, ``terra``, ``sol`` e ``lua`` da efeméride padrão."""
+    if name in ("eph", "ts", "terra", "sol", "lua"):
+        return getattr(default_ephemeris(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_ephemeris(path, start_date, end_date, targets=None, output_path=None):
     """
-    Carrega a efeméride de um arquivo ou URL.
+    Obtém um excerto da efeméride com os corpos e o intervalo pedidos.
 
-    :param url: Caminho ou URL do arquivo de efeméride.
+    Sem ``output_path``, o excerto vem do catálogo de excertos: é reutilizado
+    se já existir, ou estendido se o pedido se sobrepõe a um excerto
+    anterior do mesmo kernel.
+
+    :param path: Caminho do kernel SPK de origem.
     :param start_date: Data de início no formato 'YYYY-MM-DD'.
     :param end_date: Data de término no formato 'YYYY-MM-DD'.
-    :param targets: Lista de corpos celestes para carregar (opcional).
+    :param targets: Lista de corpos celestes, por nome ou código NAIF
+        (opcional; por padrão, todos).
     :param output_path: Caminho para salvar a efeméride (opcional).
-    :return: Efeméride carregada.
+    :return: Caminho do excerto.
     """
-    start_date = ts.ut1(start_date).tt
-    end_date = ts.ut1(end_date).tt
-    with open(path, "rb") as file:
-        spk = SPK(DAF(file))
-        summaries = spk.daf.summaries()
-        with open(output_path, "w+b") as output_file:
-            write_excerpt(spk, output_file, start_date, end_date, summaries)
-    return
+    if output_path is None:
+        return ExcerptCatalog().excerpt(path, start_date, end_date, targets)
+    if targets is not None:
+        targets = [naif_code(target) for target in targets]
+    write_segments(
+        path, output_path, julian_date(start_date), julian_date(end_date), targets
+    )
+    return Path(output_path)
+
 
+def make_observer(location, ephem=None):
+    from skyfield.api import wgs84
 
-def make_observer(location):
+    ephem = ephem or default_ephemeris()
     lat = float(location["lat"])
     lon = float(location["lon"])
-    local = terra + wgs84.latlon(latitude_degrees=lat, longitude_degrees=lon)
+    local = ephem.terra + wgs84.latlon(latitude_degrees=lat, longitude_degrees=lon)
     return local
 
 
-def find_summer_noon_time(location, year):
+def find_summer_noon_time(location, year, ephem=None):
     """Encontra o meio-dia solar no solstício de verão para um local e ano."""
-    t0 = ts.ut1(year, 1, 1)
-    t1 = ts.ut1(year, 12, 31)
-    t, y = almanac.find_discrete(t0, t1, almanac.seasons(eph))
-    _ss = t[almanac.SEASON_EVENTS.index("Summer Solstice")]
-    summer_solstice = _ss.ut1_calendar()[:3]
-    observer = make_observer(location)
+    noons = find_summer_noon_times(
+        [location["lat"]], [location["lon"]], [year], ephem=ephem
+    )
+    return get_timescale().tt_jd(noons["noon_tt"].iloc[0])
+
+
+def _cached_rows(kind, rows, solve, cache=True, ephem=None):
+    """
+    Resolve ``rows`` consultando antes o cache persistente.
+
+    As chaves combinam ``kind``, o hash do arquivo de efeméride e os valores
+    de cada linha; apenas as linhas ausentes do cache são passadas a
+    ``solve``, que deve retornar um array ``(n_linhas, n_valores)``.
+    """
+    if not cache or not results_cache.enabled:
+        return np.asarray(solve(rows), dtype=float)
+    ephem_hash = file_hash((ephem or default_ephemeris()).file)
+    keys = [make_key(kind, ephem_hash, *row) for row in rows]
+    found = results_cache.get_many(keys)
+    missing = [i for i, key in enumerate(keys) if key not in found]
+    if missing:
+        solved = np.asarray(solve([rows[i] for i in missing]), dtype=float)
+        new = {keys[i]: values.tolist() for i, values in zip(missing, solved)}
+        results_cache.set_many(new)
+        found.update(new)
+    return np.array([found[key] for key in keys], dtype=float)
+
+
+def _solve_summer_solstices(rows, ephem):
+    from skyfield.framelib import ecliptic_frame
+
+    ts = ephem.ts
+    years = np.array([year for (year,) in rows], dtype=int)
+    t = ts.ut1(years, 6, 21)
+    for _ in range(NEWTON_MAX_ITER):
+        apparent = ephem.terra.at(t).observe(ephem.sol).apparent()
+        _, slon, _ = apparent.frame_latlon(ecliptic_frame)
+        delta = (slon.degrees - 90.0 + 180.0) % 360.0 - 180.0
+        step = delta / SUN_DAILY_MOTION
+        t = ts.tt_jd(t.tt - step)
+        if np.max(np.abs(step)) < NEWTON_TOL:
+            break
+    return t.ut1[:, np.newaxis]
+
+
+def find_summer_solstices(years, cache=True, ephem=None):
+    """
+    Encontra o solstício de junho de vários anos em uma única avaliação.
+
+    Resolve longitude eclíptica aparente do Sol igual a 90° pelo método de
+    Newton, partindo de 21 de junho, para todos os anos de uma só vez.
+
+    :param years: Ano ou sequência de anos.
+    :param cache: Se True, usa o cache persistente de resultados.
+    :param ephem: Contexto de efeméride; se None, usa o padrão.
+    :return: Série com a data juliana UT1 do solstício, indexada pelo ano.
+    """
+    ephem = ephem or default_ephemeris()
+    years = np.unique(np.atleast_1d(np.asarray(years, dtype=int)))
+    rows = [(int(year),) for year in years]
+    values = _cached_rows(
+        "summer_solstice",
+        rows,
+        lambda missing: _solve_summer_solstices(missing, ephem),
+        cache,
+        ephem,
+    )
+    return pd.Series(
+        values[:, 0], index=pd.Index(years, name="year"), name="solstice_ut1"
+    )
+
+
+def _solve_summer_noon_times(rows, solstices, ephem):
+    from skyfield.api import wgs84
+
+    ts = ephem.ts
+    lat, lon, year = (np.array(column) for column in zip(*rows))
+    solstice = solstices.loc[year].to_numpy()
+
+    # Meio-dia médio local do dia (UT1) do solstício como chute inicial
+    day_start = np.floor(solstice - 0.5) + 0.5
+    jd = day_start + 0.5 - lon / 360.0
+    observer = ephem.terra + wgs84.latlon(latitude_degrees=lat, longitude_degrees=lon)
+    for _ in range(NEWTON_MAX_ITER):
+        t = ts.ut1_jd(jd)
+        ha, _, _ = observer.at(t).observe(ephem.sol).apparent().hadec()
+        step = ((ha.hours + 12.0) % 24.0 - 12.0) / 24.0
+        jd = jd - step
+        if np.max(np.abs(step)) < NEWTON_TOL:
+            break
+    t = ts.ut1_jd(jd)
+    return np.column_stack([solstice, t.ut1, t.tt])
+
+
+def find_summer_noon_times(lats, lons, years, cache=True, ephem=None):
+    """
+    Encontra o meio-dia solar no solstício de verão para vários locais e anos.
+
+    Calcula o solstício de cada ano uma única vez e resolve a passagem
+    meridiana de todos os pares (local, ano) em conjunto: cada iteração de
+    Newton sobre o ângulo horário do Sol é uma única avaliação vetorizada do
+    Skyfield. Os resultados ficam no cache persistente, indexados pelo hash
+    da efeméride e por (lat, lon, ano), e só são recalculados os ausentes.
+
+    :param lats: Latitudes dos locais em graus.
+    :param lons: Longitudes dos locais em graus.
+    :param years: Anos do experimento.
+    :param cache: Se True, usa o cache persistente de resultados.
+    :param ephem: Contexto de efeméride; se None, usa o padrão.
+    :return: DataFrame com uma linha por (local, ano) e as colunas ``lat``,
+        ``lon``, ``year``, ``solstice_ut1``, ``noon_ut1`` e ``noon_tt``
+        (datas julianas).
+    """
+    ephem = ephem or default_ephemeris()
+    lats = np.atleast_1d(np.asarray(lats, dtype=float))
+    lons = np.atleast_1d(np.asarray(lons, dtype=float))
+    if lats.shape != lons.shape:
+        raise ValueError("lats e lons devem ter o mesmo tamanho.")
+    years = np.atleast_1d(np.asarray(years, dtype=int))
+
+    site = np.repeat(np.arange(lats.size), years.size)
+    year = np.tile(years, lats.size)
+    lat, lon = lats[site], lons[site]
+    rows = [(float(a), float(b), int(c)) for a, b, c in zip(lat, lon, year)]
+
+    def solve(missing):
+        solstices = find_summer_solstices([row[2] for row in missing], cache, ephem)
+        return _solve_summer_noon_times(missing, solstices, ephem)
+
+    values = _cached_rows("summer_noon", rows, solve, cache, ephem)
+    return pd.DataFrame(
+        {
+            "lat": lat,
+            "lon": lon,
+            "year": year,
+            "solstice_ut1": values[:, 0],
+            "noon_ut1": values[:, 1],
+            "noon_tt": values[:, 2],
+        }
+    )
+
+
+def time_from_jd(jd, scale="tt", fraction=None):
+    """
+    Cria um array de instantes do Skyfield a partir de datas julianas.
 
-    t0 = ts.ut1(*summer_solstice, 0, 0)  # Meio-dia do solstício de verão
-    t1 = ts.ut1(*summer_solstice, 24, 0)  # Meio-dia do solstício de verão
-    f_01 = almanac.meridian_transits(eph, sol, observer - terra)
-    times, events = almanac.find_discrete(t0, t1, f_01)
-    noon = times[events == 1][0]
-    return noon
+    Não há conversão de calendário: os valores são usados diretamente, e
+    ``fraction`` permite passar a parte fracionária em separado para não
+    perder precisão. Para a ``Time`` do Astropy, use ``.to_astropy()``.
+
+    :param jd: Data(s) juliana(s).
+    :param scale: Escala de tempo: ``"tt"``, ``"tdb"`` ou ``"ut1"``.
+    :param fraction: Parte fracionária, somada a ``jd`` (opcional).
+    :return: Instantes do Skyfield.
+    """
+    ts = get_timescale()
+    if scale == "ut1":
+        jd = np.asarray(jd, dtype=float)
+        return ts.ut1_jd(jd if fraction is None else jd + fraction)
+    if scale not in ("tt", "tdb"):
+        raise ValueError(f"Escala desconhecida: {scale!r} (use 'tt', 'tdb' ou 'ut1')")
+    return getattr(ts, f"{scale}_jd")(jd, fraction)
 
 
 def make_time_vector(center, amplitude, num_points=100, unit="minutes"):
-    """Cria um vetor de tempo centrado em 'center' com amplitude 'amplitude'."""
-    scales = {
-        "minutes": 1 / 1440.0,  # 1 minuto em dias
-        "hours": 1 / 24.0,  # 1 hora em dias
-        "days": 1.0,  # 1 dia em dias
-        "seconds": 1 / 86400.0,  # 1 segundo em dias
-    }
-    range = np.linspace(-amplitude, amplitude, num_points)
-    center_tuples = center.ut1_calendar()
-    time_vector = (
-        ts.ut1(
-            center_tuples[0],
-            center_tuples[1],
-            center_tuples[2],
-            center_tuples[3],
-            center_tuples[4],
-        )
-        + range * scales[unit]
+    """
+    Cria um vetor de tempo centrado em 'center' com amplitude 'amplitude'.
+
+    Os instantes são obtidos somando os deslocamentos a ``center`` na
+    própria ``Time`` do Skyfield, sem passar pelo calendário.
+    """
+    offsets = np.linspace(-amplitude, amplitude, num_points) * TIME_UNITS[unit]
+    return center + offsets
+
+
+def refine_time_vector(function, times, levels=3, num_points=21, mode="min"):
+    """
+    Refina um vetor de tempo em torno do extremo de uma função.
+
+    A cada nível, ``function`` é avaliada nos instantes novos e um vetor
+    de ``num_points`` instantes é criado entre os vizinhos do extremo
+    atual; assim, a amostragem densa fica restrita ao entorno do evento
+    (por exemplo, a sombra mínima).
+
+    :param function: Função que recebe instantes do Skyfield e retorna um
+        array de valores do mesmo tamanho.
+    :param times: Vetor de tempo inicial, em ordem crescente.
+    :param levels: Número de refinamentos.
+    :param num_points: Número de instantes de cada refinamento.
+    :param mode: ``"min"`` ou ``"max"``.
+    :return: Tupla ``(times, values)`` com todas as amostras, ordenadas.
+    """
+    select = {"min": np.argmin, "max": np.argmax}[mode]
+    reference = times[0]
+    # Deslocamentos em dias em relação ao primeiro instante: pequenos, sem
+    # perda de precisão
+    offsets = (times.whole - reference.whole) + (
+        times.tt_fraction - reference.tt_fraction
     )
-    return time_vector
+    values = np.asarray(function(times), dtype=float)
+    for _ in range(levels):
+        i = int(select(values))
+        low, high = offsets[max(i - 1, 0)], offsets[min(i + 1, offsets.size - 1)]
+        grid = np.linspace(low, high, num_points)
+        grid = grid[~np.isin(grid, offsets)]
+        offsets = np.concatenate([offsets, grid])
+        values = np.concatenate(
+            [values, np.asarray(function(reference + grid), dtype=float)]
+        )
+        order = np.argsort(offsets, kind="stable")
+        offsets, values = offsets[order], values[order]
+    return reference + offsets, values
 
 
-def solar_alt_az(location, time):
+def solar_alt_az(location, time, ephem=None):
     """Calcula a altitude e o azimute do Sol para um local e instante."""
-    sol = eph["sun"]
+    sol = (ephem or default_ephemeris()).sol
     astrometric = location.at(time).observe(sol).apparent()
     alt, az, _ = astrometric.altaz()
     return alt.degrees, az.degrees
@@ -117,10 +316,11 @@ def shadow_length(height, altitude_deg):
     return height / np.tan(np.radians(altitude_deg))
 
 
-def obseve_shadow(location, times, object_height=10):
+def obseve_shadow(location, times, object_height=10, ephem=None):
     """Observa a sombra projetada de um objeto em um determinado local."""
-    obs = make_observer(location)
-    astrometric = obs.at(times).observe(sol).apparent()
+    ephem = ephem or default_ephemeris()
+    obs = make_observer(location, ephem)
+    astrometric = obs.at(times).observe(ephem.sol).apparent()
     alt, az, _ = astrometric.altaz()
     shadow_length_ = shadow_length(object_height, alt.degrees)
     df = pd.DataFrame(
@@ -130,8 +330,146 @@ def obseve_shadow(location, times, object_height=10):
     return df
 
 
-def get_noon_times(location, year=2023):
+def solar_altitudes(lat, lon, jd_tt, ephem):
+    """Altura aparente do Sol, em graus, para arrays de locais e instantes TT."""
+    from skyfield.api import wgs84
+
+    observer = ephem.terra + wgs84.latlon(latitude_degrees=lat, longitude_degrees=lon)
+    t = ephem.ts.tt_jd(jd_tt)
+    alt, _, _ = observer.at(t).observe(ephem.sol).apparent().altaz()
+    return alt.degrees
+
+
+def find_max_altitudes(lats, lons, guess_tt, ephem=None, step=MAX_ALT_STEP):
+    """
+    Encontra o instante da altura máxima do Sol (sombra mínima) em cada local.
+
+    Usa o método de Newton sobre a derivada da altura, com derivadas por
+    diferenças centrais de passo ``step``: cada iteração avalia os três
+    instantes de todos os locais em uma única chamada ao Skyfield. Partindo
+    da passagem meridiana, converge em duas ou três iterações.
+
+    :param lats: Latitudes dos locais em graus.
+    :param lons: Longitudes dos locais em graus.
+    :param guess_tt: Chute inicial (data juliana TT) para cada local.
+    :param ephem: Contexto de efeméride; se None, usa o padrão.
+    :param step: Passo das diferenças centrais, em dias.
+    :return: Tupla ``(jd_tt, alt)`` com os instantes e as alturas máximas.
+    """
+    ephem = ephem or default_ephemeris()
+    lat = np.atleast_1d(np.asarray(lats, dtype=float))
+    lon = np.atleast_1d(np.asarray(lons, dtype=float))
+    jd = np.atleast_1d(np.asarray(guess_tt, dtype=float)).copy()
+    lat3, lon3 = np.tile(lat, 3), np.tile(lon, 3)
+    for _ in range(NEWTON_MAX_ITER):
+        alt = solar_altitudes(
+            lat3, lon3, np.concatenate([jd - step, jd, jd + step]), ephem
+        )
+        before, center, after = np.split(alt, 3)
+        first = (after - before) / (2 * step)
+        second = (after - 2 * center + before) / step**2
+        delta = np.where(second < 0, -first / second, 0.0)
+        delta = np.clip(delta, -10 * step, 10 * step)
+        jd = jd + delta
+        if np.max(np.abs(delta)) < NEWTON_TOL:
+            break
+    return jd, solar_altitudes(lat, lon, jd, ephem)
+
+
+def find_shadow_crossings(
+    lats, lons, lengths, peak_tt, object_height=10, ephem=None, span=0.5
+):
+    """
+    Encontra os instantes em que a sombra atinge um comprimento dado.
+
+    O comprimento ``L`` corresponde à altura ``arctan(h / L)`` do Sol. Cada
+    local tem um intervalo antes e outro depois da altura máxima, e as raízes
+    são refinadas pelo método de Illinois (falsa posição modificada), com uma
+    avaliação vetorizada por iteração para todos os locais e intervalos.
+
+    :param lats: Latitudes dos locais em graus.
+    :param lons: Longitudes dos locais em graus.
+    :param lengths: Comprimento da sombra procurado, em metros.
+    :param peak_tt: Instante da altura máxima (ver :func:`find_max_altitudes`).
+    :param object_height: Altura do gnômon em metros.
+    :param ephem: Contexto de efeméride; se None, usa o padrão.
+    :param span: Largura, em dias, de cada intervalo de busca.
+    :return: Tupla ``(manhã, tarde)`` de datas julianas TT; NaN onde a
+        sombra não atinge o comprimento no intervalo.
+    """
+    ephem = ephem or default_ephemeris()
+    peak = np.atleast_1d(np.asarray(peak_tt, dtype=float))
+    lat = np.broadcast_to(np.asarray(lats, dtype=float), peak.shape)
+    lon = np.broadcast_to(np.asarray(lons, dtype=float), peak.shape)
+    target = np.degrees(np.arctan2(object_height, np.asarray(lengths, dtype=float)))
+    target = np.broadcast_to(target, peak.shape)
+
+    lat2, lon2 = np.tile(lat, 2), np.tile(lon, 2)
+    target2 = np.tile(target, 2)
+    a = np.concatenate([peak - span, peak])
+    b = np.concatenate([peak, peak + span])
+    fa = solar_altitudes(lat2, lon2, a, ephem) - target2
+    fb = solar_altitudes(lat2, lon2, b, ephem) - target2
+    valid = np.sign(fa) != np.sign(fb)
+    for _ in range(4 * NEWTON_MAX_ITER):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            c = b - fb * (b - a) / (fb - fa)
+        c = np.where(valid & np.isfinite(c), c, b)
+        fc = solar_altitudes(lat2, lon2, c, ephem) - target2
+        # Illinois: se c cai do mesmo lado de b, o peso de a cai à metade
+        same = np.sign(fc) == np.sign(fb)
+        a, fa = np.where(same, a, b), np.where(same, fa / 2, fb)
+        b, fb = c, fc
+        if np.max(np.abs(b - a)[valid], initial=0.0) < NEWTON_TOL:
+            break
+    roots = np.where(valid, b, np.nan)
+    return roots[: peak.size], roots[peak.size :]
+
+
+def find_minimum_shadows(lats, lons, years, object_height=10, ephem=None):
+    """
+    Sombra mínima no solstício de verão para vários locais e anos.
+
+    Parte da passagem meridiana de :func:`find_summer_noon_times` e refina o
+    instante da altura máxima do Sol com :func:`find_max_altitudes`.
+
+    :return: DataFrame de :func:`find_summer_noon_times` com as colunas
+        ``min_shadow_tt``, ``max_alt`` e ``min_shadow``.
+    """
+    noons = find_summer_noon_times(lats, lons, years, ephem=ephem)
+    jd, alt = find_max_altitudes(
+        noons["lat"], noons["lon"], noons["noon_tt"], ephem=ephem
+    )
+    noons["min_shadow_tt"] = jd
+    noons["max_alt"] = alt
+    noons["min_shadow"] = shadow_length(object_height, alt)
+    return noons
+
+
+def get_noon_times(location, year=2023, ephem=None):
     """Obtém o meio-dia solar para um local e ano específicos."""
-    noon = find_summer_noon_time(location, year)
+    noon = find_summer_noon_time(location, year, ephem)
     times = make_time_vector(noon, 60, 61, "minutes")
     return noon, times
+
+
+def get_noon_times_batch(locations, year=2023, ephem=None):
+    """
+    Obtém o meio-dia solar e o vetor de tempo para vários locais de uma vez.
+
+    :param locations: Sequência de locais com chaves ``lat`` e ``lon``.
+    :param year: Ano do experimento.
+    :param ephem: Contexto de efeméride; se None, usa o padrão.
+    :return: Lista de tuplas ``(noon, times)`` na ordem dos locais.
+    """
+    noons = find_summer_noon_times(
+        [location["lat"] for location in locations],
+        [location["lon"] for location in locations],
+        [year],
+        ephem=ephem,
+    )
+    results = []
+    for noon_tt in noons["noon_tt"]:
+        noon = get_timescale().tt_jd(noon_tt)
+        results.append((noon, make_time_vector(noon, 60, 61, "minutes")))
+    return results
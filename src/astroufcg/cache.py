@@ -0,0 +1,158 @@
+"""Cache persistente em disco para resultados astronômicos."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from functools import lru_cache
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get("ASTROUFCG_CACHE_DIR", Path.home() / ".cache" / "astroufcg")
+)
+DEFAULT_MAX_BYTES = 64 * 2**20  # 64 MiB por cache
+CACHE_DISABLED = os.environ.get("ASTROUFCG_CACHE", "1") == "0"
+
+
+@lru_cache(maxsize=32)
+def _file_hash(path, mtime_ns, size):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(2**20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_hash(path):
+    """
+    Calcula o hash SHA-256 do conteúdo de um arquivo.
+
+    O resultado é memorizado por (caminho, data de modificação, tamanho),
+    de modo que o arquivo só é relido quando muda.
+
+    :param path: Caminho do arquivo.
+    :return: Hash hexadecimal do conteúdo.
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    return _file_hash(path.as_posix(), stat.st_mtime_ns, stat.st_size)
+
+
+def make_key(*parts):
+    """Gera uma chave de cache estável a partir de valores serializáveis em JSON."""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class DiskCache:
+    """
+    Cache chave-valor persistente em SQLite com limite de tamanho.
+
+    Os valores são serializados em JSON. Quando o tamanho total ultrapassa
+    ``max_bytes``, as entradas acessadas há mais tempo são descartadas.
+    A conexão é aberta a cada operação, o que torna o cache seguro entre
+    processos.
+    """
+
+    def __init__(self, name, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.name = name
+        self.directory = Path(directory) if directory is not None else DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.enabled = not CACHE_DISABLED
+
+    @property
+    def path(self):
+        return self.directory / f"{self.name}.sqlite"
+
+    def _connect(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT, size INTEGER, atime REAL)"
+        )
+        return connection
+
+    def get_many(self, keys):
+        """Retorna um dicionário com as entradas encontradas para ``keys``."""
+        keys = list(keys)
+        if not self.enabled or not keys:
+            return {}
+        found = {}
+        connection = self._connect()
+        with connection:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = connection.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({marks})", chunk
+                ).fetchall()
+                found.update((key, json.loads(value)) for key, value in rows)
+                connection.execute(
+                    f"UPDATE cache SET atime = ? WHERE key IN ({marks})",
+                    [time.time(), *chunk],
+                )
+        connection.close()
+        return found
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, items):
+        """Grava os pares ``(chave, valor)`` e aplica o limite de tamanho."""
+        if not self.enabled:
+            return
+        now = time.time()
+        rows = []
+        for key, value in dict(items).items():
+            payload = json.dumps(value)
+            rows.append((key, payload, len(payload), now))
+        if not rows:
+            return
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)", rows
+            )
+            self._evict(connection)
+        connection.close()
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def _evict(self, connection):
+        (total,) = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        stale = []
+        for key, size in connection.execute(
+            "SELECT key, size FROM cache ORDER BY atime"
+        ):
+            stale.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        connection.executemany("DELETE FROM cache WHERE key = ?", stale)
+
+    def size(self):
+        """Tamanho total, em bytes, dos valores armazenados."""
+        if not self.path.exists():
+            return 0
+        connection = self._connect()
+        (total,) = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache"
+        ).fetchone()
+        connection.close()
+        return total
+
+    def clear(self):
+        """Remove todas as entradas."""
+        if self.path.exists():
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM cache")
+            connection.close()
@@ -0,0 +1,259 @@
+"""
+Avaliação vetorizada dos polinômios de Chebyshev de kernels SPK.
+
+Além das posições baricêntricas e astrométricas, :meth:`ChebyshevKernel.apparent`
+aplica a deflexão da luz pelo Sol, Júpiter e Saturno e a aberração anual,
+como ``.apparent()`` do Skyfield para um observador no centro de um corpo.
+A deflexão pela própria Terra, que o Skyfield aplica a observadores na
+superfície, não é incluída.
+"""
+
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from .excerpts import naif_code
+
+T0 = 2451545.0  # J2000, em data juliana TDB
+S_PER_DAY = 86400.0
+C_KM_S = 299792.458
+GS = 1.32712440017987e20  # parâmetro gravitacional do Sol, m³/s²
+
+# Inverso da massa dos corpos que defletem a luz, em massas solares
+RECIPROCAL_MASSES = {10: 1.0, 5: 1047.3486, 6: 3497.898}
+
+
+class Segment(NamedTuple):
+    """Segmento SPK de tipo 2 ou 3, com os coeficientes mapeados em memória."""
+
+    center: int
+    start: float
+    end: float
+    init: float
+    intlen: float
+    coefficients: np.ndarray  # (n_registros, 3, n_coeficientes)
+
+
+def _seconds(times):
+    """Segundos TDB desde J2000 para instantes do Skyfield ou datas julianas TDB."""
+    if hasattr(times, "tdb_fraction"):
+        whole = np.asarray(times.whole, dtype=float)
+        return (whole - T0) * S_PER_DAY + np.asarray(times.tdb_fraction) * S_PER_DAY
+    return (np.asarray(times, dtype=float) - T0) * S_PER_DAY
+
+
+def _evaluate(segment, seconds, velocity=False):
+    """
+    Posições ``(3, n)`` de um segmento.
+
+    Os polinômios de Chebyshev são calculados para todos os instantes de
+    uma vez; em seguida, cada registro do segmento contribui com um único
+    produto de matrizes sobre o trecho contíguo de instantes que ele cobre.
+    Com ``velocity=True`` devolve ``(6, n)``: posição e velocidade (km/s),
+    esta pelas derivadas dos mesmos polinômios.
+    """
+    rows = 6 if velocity else 3
+    if seconds.size == 0:
+        return np.empty((rows, 0))
+    coefficients = segment.coefficients
+    order = None
+    if seconds.size > 1 and np.any(np.diff(seconds) < 0):
+        order = np.argsort(seconds, kind="stable")
+        seconds = seconds[order]
+    index = np.floor((seconds - segment.init) / segment.intlen).astype(int)
+    index = np.clip(index, 0, coefficients.shape[0] - 1)
+    offset = seconds - segment.init - index * segment.intlen
+    s = 2.0 * offset / segment.intlen - 1.0
+
+    basis = np.empty((coefficients.shape[2], seconds.size))
+    basis[0] = 1.0
+    if basis.shape[0] > 1:
+        basis[1] = s
+    for k in range(2, basis.shape[0]):
+        np.multiply(2.0 * s, basis[k - 1], out=basis[k])
+        basis[k] -= basis[k - 2]
+    if velocity:
+        # T'_k = 2 T_{k-1} + 2 s T'_{k-1} - T'_{k-2}, em unidades de s
+        derivative = np.zeros_like(basis)
+        if basis.shape[0] > 1:
+            derivative[1] = 1.0
+        for k in range(2, basis.shape[0]):
+            np.multiply(2.0 * s, derivative[k - 1], out=derivative[k])
+            derivative[k] += 2.0 * basis[k - 1] - derivative[k - 2]
+        basis = np.concatenate([basis, derivative * (2.0 / segment.intlen)])
+
+    position = np.empty((rows, seconds.size))
+    bounds = np.flatnonzero(np.diff(index)) + 1
+    for start, end in zip(np.r_[0, bounds], np.r_[bounds, seconds.size]):
+        record = coefficients[index[start]]
+        if velocity:
+            record = np.kron(np.eye(2), record)
+        position[:, start:end] = record @ basis[:, start:end]
+    if order is not None:
+        position[:, order] = position.copy()
+    return position
+
+
+class ChebyshevKernel:
+    """
+    Kernel SPK avaliado diretamente pelos coeficientes de Chebyshev.
+
+    Os segmentos de tipo 2 e 3 são mapeados em memória pelo jplephem, sem
+    cópia, e cada avaliação percorre um array inteiro de instantes com o
+    NumPy, sem criar objetos do Skyfield. As posições são baricêntricas,
+    em km, no referencial ICRF. O arquivo é fechado ao fim da leitura dos
+    sumários; o mapa de memória vive enquanto o kernel existir.
+
+    :param file: Caminho do kernel SPK.
+    """
+
+    def __init__(self, file):
+        from jplephem.daf import DAF
+
+        self.file = Path(file)
+        self.segments = {}
+        with self.file.open("rb") as handle:
+            daf = DAF(handle)
+            for _, values in daf.summaries():
+                start, end, target, center, _, data_type, first, last = values
+                if data_type not in (2, 3):
+                    continue
+                init, intlen, rsize, n = daf.read_array(last - 3, last)
+                records = daf.map_array(first, last - 4).reshape(int(n), int(rsize))
+                components = 3 if data_type == 2 else 6
+                count = (int(rsize) - 2) // components
+                coefficients = records[:, 2 : 2 + 3 * count].reshape(int(n), 3, count)
+                self.segments.setdefault(int(target), []).append(
+                    Segment(int(center), start, end, init, intlen, coefficients)
+                )
+
+    def __repr__(self):
+        return f"ChebyshevKernel({self.file.as_posix()!r})"
+
+    def _relative(self, target, seconds, velocity=False):
+        """Posição de ``target`` em relação ao seu centro e o código do centro."""
+        segments = self.segments.get(target)
+        if not segments:
+            raise KeyError(f"O kernel não tem segmentos para o corpo {target}.")
+        if len(segments) == 1:
+            segment = segments[0]
+            if seconds.min() < segment.start or seconds.max() > segment.end:
+                raise ValueError(f"Instantes fora do intervalo do corpo {target}.")
+            return _evaluate(segment, seconds, velocity), segment.center
+        position = np.full((6 if velocity else 3, seconds.size), np.nan)
+        for segment in segments:
+            mask = (seconds >= segment.start) & (seconds <= segment.end)
+            if mask.any():
+                position[:, mask] = _evaluate(segment, seconds[mask], velocity)
+        if np.isnan(position[0]).any():
+            raise ValueError(f"Instantes fora do intervalo do corpo {target}.")
+        return position, segments[0].center
+
+    def position(self, body, times):
+        """
+        Posição baricêntrica de um corpo.
+
+        :param body: Nome ou código NAIF.
+        :param times: Instantes do Skyfield ou datas julianas TDB.
+        :return: Array ``(3, n)`` em km.
+        """
+        return self._barycentric(naif_code(body), np.atleast_1d(_seconds(times)))
+
+    def _barycentric(self, code, seconds, velocity=False):
+        position = np.zeros((6 if velocity else 3, seconds.size))
+        while code != 0:
+            relative, code = self._relative(code, seconds, velocity)
+            position += relative
+        return position
+
+    def _light_time(self, target, origin, seconds, iterations):
+        """Vetor do observador ao alvo e o tempo-luz, em segundos."""
+        delay = np.zeros_like(seconds)
+        for _ in range(iterations):
+            vector = self._barycentric(target, seconds - delay) - origin
+            delay = np.linalg.norm(vector, axis=0) / C_KM_S
+        return vector, delay
+
+    def astrometric(self, target, observer, times, iterations=3):
+        """
+        Posição de ``target`` vista de ``observer``, corrigida do tempo-luz.
+
+        Corresponde a ``eph[observer].at(t).observe(eph[target])`` do
+        Skyfield; aberração e deflexão da luz não são aplicadas.
+
+        :param target: Nome ou código NAIF do corpo observado.
+        :param observer: Nome ou código NAIF do observador.
+        :param times: Instantes do Skyfield ou datas julianas TDB.
+        :return: Array ``(3, n)`` em km.
+        """
+        seconds = np.atleast_1d(_seconds(times))
+        origin = self._barycentric(naif_code(observer), seconds)
+        vector, _ = self._light_time(naif_code(target), origin, seconds, iterations)
+        return vector
+
+    def apparent(self, target, observer, times, deflectors=(10, 5, 6), iterations=3):
+        """
+        Posição aparente de ``target`` vista do centro de ``observer``.
+
+        Corresponde a ``eph[observer].at(t).observe(eph[target]).apparent()``
+        do Skyfield: à posição astrométrica somam-se a deflexão da luz por
+        ``deflectors`` e a aberração pela velocidade baricêntrica do
+        observador. Com ``observer="earth"`` o resultado está no GCRS.
+
+        :param target: Nome ou código NAIF do corpo observado.
+        :param observer: Nome ou código NAIF do observador.
+        :param times: Instantes do Skyfield ou datas julianas TDB.
+        :param deflectors: Códigos NAIF dos corpos que defletem a luz; os
+            padrões são o Sol e os baricentros de Júpiter e Saturno.
+        :return: Array ``(3, n)`` em km.
+        """
+        seconds = np.atleast_1d(_seconds(times))
+        state = self._barycentric(naif_code(observer), seconds, velocity=True)
+        origin, velocity = state[:3], state[3:]
+        vector, delay = self._light_time(naif_code(target), origin, seconds, iterations)
+
+        for code in deflectors:
+            # Posição do defletor quando a luz passou mais perto dele
+            toward = self._barycentric(code, seconds) - origin
+            unit = vector / np.linalg.norm(vector, axis=0)
+            closest = np.einsum("ij,ij->j", unit, toward) / C_KM_S
+            pe = origin - self._barycentric(code, seconds - np.clip(closest, 0, delay))
+            vector = vector + _deflection(vector, pe, RECIPROCAL_MASSES[code])
+        return _aberration(vector, velocity, delay)
+
+
+def _deflection(position, pe, reciprocal_mass):
+    """
+    Deflexão da luz por um corpo, como em ``skyfield.relativity``.
+
+    :param position: Vetor do observador ao alvo, em km.
+    :param pe: Vetor do defletor ao observador, em km.
+    :param reciprocal_mass: Inverso da massa do defletor, em massas solares.
+    """
+    pq = position + pe
+    pmag = np.linalg.norm(position, axis=0)
+    qmag = np.linalg.norm(pq, axis=0)
+    emag = np.linalg.norm(pe, axis=0)
+    phat = position / pmag
+    qhat = pq / np.where(qmag > 0, qmag, 1.0)
+    ehat = pe / emag
+    pdotq = np.einsum("ij,ij->j", phat, qhat)
+    qdote = np.einsum("ij,ij->j", qhat, ehat)
+    edotp = np.einsum("ij,ij->j", ehat, phat)
+    # Sem deflexão quando o defletor está na linha de visada (o próprio alvo)
+    aligned = np.abs(edotp) > 0.99999999999
+    factor = 2.0 * GS / (C_KM_S**2 * 1e6 * emag * 1e3 * reciprocal_mass)
+    deflection = factor * (pdotq * ehat - edotp * qhat) / (1.0 + qdote) * pmag
+    return np.where(aligned, 0.0, deflection)
+
+
+def _aberration(position, velocity, delay):
+    """Aberração relativística pela velocidade do observador (km/s)."""
+    speed = np.linalg.norm(velocity, axis=0)
+    beta = speed / C_KM_S
+    cosd = np.einsum("ij,ij->j", position, velocity) / (delay * C_KM_S * speed)
+    gammai = np.sqrt(1.0 - beta * beta)
+    p = beta * cosd
+    q = (1.0 + p / (1.0 + gammai)) * delay
+    return (gammai * position + q * velocity) / (1.0 + p)
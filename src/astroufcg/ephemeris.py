@@ -0,0 +1,105 @@
+"""Contexto de efeméride compartilhado e carregado sob demanda."""
+
+from functools import cached_property, lru_cache
+from pathlib import Path
+
+DEFAULT_EPHEM_FILE = (
+    Path(__file__).resolve().parents[2] / "data" / "skyfield" / "de431_excerpt.bsp"
+)
+
+_contexts = {}
+_default = {"file": DEFAULT_EPHEM_FILE}
+
+
+@lru_cache(maxsize=1)
+def get_timescale():
+    """Retorna a escala de tempo do Skyfield, única para todo o processo."""
+    from skyfield.api import load
+
+    return load.timescale()
+
+
+class Ephemeris:
+    """
+    Efeméride SPK carregada apenas no primeiro uso.
+
+    O kernel é aberto pelo jplephem, que mapeia o arquivo em memória, e a
+    escala de tempo é compartilhada entre todos os contextos. Instâncias são
+    obtidas por :func:`ephemeris_context`, que devolve sempre o mesmo objeto
+    para o mesmo arquivo; ao serem serializadas (por exemplo, para um
+    processo filho) levam apenas o caminho do arquivo.
+    """
+
+    def __init__(self, file=DEFAULT_EPHEM_FILE):
+        self.file = Path(file)
+
+    def __repr__(self):
+        state = "carregada" if "eph" in self.__dict__ else "não carregada"
+        return f"Ephemeris({self.file.as_posix()!r}, {state})"
+
+    def __reduce__(self):
+        return ephemeris_context, (self.file,)
+
+    @cached_property
+    def eph(self):
+        from skyfield.api import load_file
+
+        if not self.file.exists():
+            raise FileNotFoundError(f"Arquivo de efeméride não encontrado: {self.file}")
+        return load_file(self.file.as_posix())
+
+    @property
+    def ts(self):
+        return get_timescale()
+
+    @cached_property
+    def terra(self):
+        return self.eph["earth"]
+
+    @cached_property
+    def sol(self):
+        return self.eph["sun"]
+
+    @cached_property
+    def lua(self):
+        return self.eph["moon"]
+
+    @cached_property
+    def chebyshev(self):
+        """Avaliador vetorizado do mesmo kernel; ver :class:`ChebyshevKernel`."""
+        from .chebyshev import ChebyshevKernel
+
+        return ChebyshevKernel(self.file)
+
+    @property
+    def loaded(self):
+        return "eph" in self.__dict__
+
+
+def ephemeris_context(file=None):
+    """
+    Retorna o contexto de efeméride de um arquivo, criando-o se necessário.
+
+    :param file: Caminho do arquivo SPK. Se None, usa o padrão do processo.
+    :return: Instância compartilhada de :class:`Ephemeris`.
+    """
+    file = Path(file if file is not None else _default["file"]).resolve()
+    if file not in _contexts:
+        _contexts[file] = Ephemeris(file)
+    return _contexts[file]
+
+
+def set_default_ephemeris(file):
+    """
+    Define o arquivo de efeméride usado quando nenhum contexto é passado.
+
+    :param file: Caminho do arquivo SPK.
+    :return: Contexto associado ao arquivo.
+    """
+    _default["file"] = Path(file)
+    return ephemeris_context(file)
+
+
+def default_ephemeris():
+    """Retorna o contexto de efeméride padrão do processo."""
+    return ephemeris_context()
@@ -0,0 +1,245 @@
+"""Catálogo de excertos de kernels SPK por corpos e intervalo de tempo."""
+
+import json
+import re
+from pathlib import Path
+
+from .cache import make_key
+
+DEFAULT_EXCERPT_DIR = (
+    Path(__file__).resolve().parents[2] / "data" / "skyfield" / "excerpts"
+)
+DATE_PATTERN = re.compile(r"^(-?\d+)-(\d{1,2})-(\d{1,2})$")
+
+# Códigos NAIF dos corpos dos kernels DE, pelos nomes usados pelo Skyfield
+NAIF_CODES = {
+    "SOLAR SYSTEM BARYCENTER": 0,
+    "SSB": 0,
+    "MERCURY BARYCENTER": 1,
+    "VENUS BARYCENTER": 2,
+    "EARTH BARYCENTER": 3,
+    "EARTH MOON BARYCENTER": 3,
+    "EARTH-MOON BARYCENTER": 3,
+    "EMB": 3,
+    "MARS BARYCENTER": 4,
+    "JUPITER BARYCENTER": 5,
+    "SATURN BARYCENTER": 6,
+    "URANUS BARYCENTER": 7,
+    "NEPTUNE BARYCENTER": 8,
+    "PLUTO BARYCENTER": 9,
+    "SUN": 10,
+    "MERCURY": 199,
+    "VENUS": 299,
+    "MOON": 301,
+    "EARTH": 399,
+    "MARS": 499,
+    "JUPITER": 599,
+    "SATURN": 699,
+    "URANUS": 799,
+    "NEPTUNE": 899,
+    "PLUTO": 999,
+}
+
+# Corpos que sempre acompanham outro num excerto: a Lua é vista da Terra
+COMPANIONS = {301: (399,)}
+
+
+def naif_code(body):
+    """
+    Converte o nome de um corpo no seu código NAIF.
+
+    :param body: Código inteiro ou nome de ``NAIF_CODES``, como
+        ``"earth"``, ``"moon"`` ou ``"mars barycenter"``.
+    :return: Código NAIF.
+    """
+    if isinstance(body, int):
+        return body
+    name = " ".join(str(body).replace("_", " ").upper().split())
+    if name.lstrip("-").isdigit():
+        return int(name)
+    if name not in NAIF_CODES:
+        raise ValueError(f"Corpo desconhecido: {body!r}")
+    return NAIF_CODES[name]
+
+
+def julian_date(value):
+    """
+    Converte uma data em data juliana TDB.
+
+    :param value: Data ``'YYYY-MM-DD'`` (o ano pode ser negativo), data
+        juliana ou instante do Skyfield.
+    :return: Data juliana TDB.
+    """
+    from .ephemeris import get_timescale
+
+    if hasattr(value, "tdb"):
+        return float(value.tdb)
+    if isinstance(value, str):
+        match = DATE_PATTERN.match(value.strip())
+        if match is None:
+            raise ValueError(f"Data inválida: {value!r} (use 'YYYY-MM-DD').")
+        year, month, day = (int(part) for part in match.groups())
+        return float(get_timescale().tdb(year, month, day).tdb)
+    return float(value)
+
+
+def select_segments(summaries, targets=None):
+    """
+    Seleciona os segmentos necessários para posicionar ``targets``.
+
+    Além dos segmentos dos próprios corpos, inclui os dos centros em que
+    eles se apoiam (por exemplo, o baricentro Terra-Lua para a Lua), até o
+    baricentro do Sistema Solar, e os de ``COMPANIONS``: um excerto só com
+    a Lua leva também a Terra, de onde ela é observada.
+
+    :param summaries: Pares ``(nome, valores)`` de ``SPK.daf.summaries()``.
+    :param targets: Códigos NAIF; se None, todos os segmentos.
+    :return: Lista de pares ``(nome, valores)`` selecionados.
+    """
+    summaries = list(summaries)
+    if targets is None:
+        return summaries
+    wanted = set(targets)
+    for target in targets:
+        wanted.update(COMPANIONS.get(target, ()))
+    while True:
+        centers = {
+            int(values[3])
+            for _, values in summaries
+            if int(values[2]) in wanted and int(values[3]) != 0
+        }
+        if centers <= wanted:
+            break
+        wanted |= centers
+    return [(name, values) for name, values in summaries if int(values[2]) in wanted]
+
+
+def write_segments(source, output, start_jd, end_jd, targets=None):
+    """
+    Grava em ``output`` o excerto de ``source`` com os corpos pedidos.
+
+    :return: Códigos NAIF dos segmentos gravados.
+    """
+    from jplephem.excerpter import write_excerpt
+    from jplephem.spk import SPK
+
+    spk = SPK.open(Path(source).as_posix())
+    try:
+        summaries = select_segments(spk.daf.summaries(), targets)
+        if not summaries:
+            raise ValueError(f"Nenhum segmento de {targets} em {source}.")
+        with open(output, "w+b") as output_file:
+            write_excerpt(spk, output_file, start_jd, end_jd, summaries)
+    finally:
+        spk.close()
+    return sorted({int(values[2]) for _, values in summaries})
+
+
+class ExcerptCatalog:
+    """
+    Catálogo de excertos SPK, guardado em ``catalog.json`` no diretório.
+
+    Cada entrada registra o kernel de origem, os corpos e o intervalo do
+    excerto. Um pedido coberto por uma entrada devolve o arquivo existente
+    sem abrir o kernel de origem; um pedido que se sobrepõe a entradas da
+    mesma origem gera um único excerto com a união dos corpos e dos
+    intervalos, que substitui as entradas anteriores.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = (
+            Path(directory) if directory is not None else DEFAULT_EXCERPT_DIR
+        )
+
+    @property
+    def path(self):
+        return self.directory / "catalog.json"
+
+    def entries(self):
+        """Lista as entradas do catálogo."""
+        if not self.path.exists():
+            return []
+        return json.loads(self.path.read_text())
+
+    def _save(self, entries):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(entries, indent=2))
+
+    @staticmethod
+    def _source_id(source):
+        source = Path(source).resolve()
+        return {"source": source.as_posix(), "size": source.stat().st_size}
+
+    def find(self, source, start_jd, end_jd, targets=None):
+        """Retorna o caminho de um excerto que cobre o pedido, ou None."""
+        source_id = self._source_id(source)
+        for entry in self.entries():
+            if {key: entry[key] for key in source_id} != source_id:
+                continue
+            if entry["start_jd"] > start_jd or entry["end_jd"] < end_jd:
+                continue
+            if targets is None and not entry["all_targets"]:
+                continue
+            if targets is not None and not set(targets) <= set(entry["targets"]):
+                continue
+            file = self.directory / entry["file"]
+            if file.exists():
+                return file
+        return None
+
+    def excerpt(self, source, start_date, end_date, targets=None):
+        """
+        Retorna um excerto de ``source`` com ``targets`` entre as datas.
+
+        :param source: Kernel SPK de origem.
+        :param start_date: Data inicial (ver :func:`julian_date`).
+        :param end_date: Data final.
+        :param targets: Corpos, por nome ou código NAIF; se None, todos.
+        :return: Caminho do excerto.
+        """
+        start_jd, end_jd = julian_date(start_date), julian_date(end_date)
+        if targets is not None:
+            targets = {naif_code(target) for target in targets}
+            for target in list(targets):
+                targets.update(COMPANIONS.get(target, ()))
+            targets = sorted(targets)
+        found = self.find(source, start_jd, end_jd, targets)
+        if found is not None:
+            return found
+
+        source_id = self._source_id(source)
+        entries = self.entries()
+        merged, kept = [], []
+        for entry in entries:
+            same_source = {key: entry[key] for key in source_id} == source_id
+            overlaps = entry["start_jd"] <= end_jd and entry["end_jd"] >= start_jd
+            (merged if same_source and overlaps else kept).append(entry)
+
+        all_targets = targets is None or any(e["all_targets"] for e in merged)
+        for entry in merged:
+            start_jd = min(start_jd, entry["start_jd"])
+            end_jd = max(end_jd, entry["end_jd"])
+            if not all_targets:
+                targets = sorted(set(targets) | set(entry["targets"]))
+
+        name = make_key(source_id, None if all_targets else targets, start_jd, end_jd)
+        file = self.directory / f"{Path(source).stem}_{name[:12]}.bsp"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        written = write_segments(
+            source, file, start_jd, end_jd, None if all_targets else targets
+        )
+        kept.append(
+            {
+                **source_id,
+                "file": file.name,
+                "start_jd": start_jd,
+                "end_jd": end_jd,
+                "targets": written,
+                "all_targets": all_targets,
+            }
+        )
+        self._save(kept)
+        for entry in merged:
+            if entry["file"] != file.name:
+                (self.directory / entry["file"]).unlink(missing_ok=True)
+        return file
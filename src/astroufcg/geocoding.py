@@ -0,0 +1,327 @@
+"""Geocodificação com gazetteer local e cache persistente."""
+
+import csv
+import math
+import os
+import sqlite3
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+
+from .cache import DEFAULT_CACHE_DIR, DiskCache, file_hash, make_key
+
+GAZETTEER_CSV = Path(__file__).resolve().parents[2] / "data" / "gazetteer.csv"
+OFFLINE = os.environ.get("ASTROUFCG_OFFLINE", "0") == "1"
+REVERSE_TOLERANCE = 0.05  # graus
+TIMEZONE_DECIMALS = 2  # casas decimais das coordenadas no cache de fusos (~1 km)
+
+_default = {"geocoder": None}
+
+
+def normalize(name):
+    """Normaliza um nome de local: sem acentos, caixa e espaços extras."""
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(text.casefold().replace(",", " ").split())
+
+
+class Gazetteer:
+    """
+    Tabela local de locais conhecidos, guardada em SQLite.
+
+    A tabela é carregada de ``data/gazetteer.csv`` e recarregada sempre que
+    o hash do CSV muda: os locais vindos da versão anterior são trocados
+    pelos da nova, e os adicionados por :meth:`add_many` são mantidos. As
+    consultas diretas comparam nomes normalizados; as reversas procuram o
+    local mais próximo dentro de ``REVERSE_TOLERANCE`` graus.
+    """
+
+    def __init__(self, path=None, seed=GAZETTEER_CSV):
+        self.path = (
+            Path(path) if path is not None else DEFAULT_CACHE_DIR / "gazetteer.sqlite"
+        )
+        self.seed = Path(seed) if seed is not None else None
+        self._seeded = False
+
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS places ("
+            "key TEXT PRIMARY KEY, name TEXT, lat REAL, lon REAL, city TEXT)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS places_lat ON places (lat)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        connection.execute("CREATE TABLE IF NOT EXISTS seeded (key TEXT PRIMARY KEY)")
+        if not self._seeded:
+            self._seeded = True
+            if self.seed is not None and self.seed.exists():
+                self._reseed(connection)
+        return connection
+
+    def _reseed(self, connection):
+        """Recarrega o CSV de origem se o hash guardado for outro."""
+        digest = file_hash(self.seed)
+        row = connection.execute(
+            "SELECT value FROM meta WHERE key = 'seed_hash'"
+        ).fetchone()
+        if row is not None and row[0] == digest:
+            return
+        records = self._read_csv(self.seed)
+        with connection:
+            connection.execute(
+                "DELETE FROM places WHERE key IN (SELECT key FROM seeded)"
+            )
+            connection.execute("DELETE FROM seeded")
+            self._insert(connection, records)
+            connection.executemany(
+                "INSERT OR IGNORE INTO seeded VALUES (?)",
+                [(normalize(name),) for name, *_ in records],
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('seed_hash', ?)", (digest,)
+            )
+
+    @staticmethod
+    def _read_csv(path):
+        with open(path, newline="", encoding="utf-8") as file:
+            return [
+                (row["name"], float(row["lat"]), float(row["lon"]), row.get("city"))
+                for row in csv.DictReader(file)
+            ]
+
+    @staticmethod
+    def _insert(connection, records):
+        connection.executemany(
+            "INSERT OR REPLACE INTO places VALUES (?, ?, ?, ?, ?)",
+            [
+                (normalize(name), name, float(lat), float(lon), city)
+                for name, lat, lon, city in records
+            ],
+        )
+
+    def add_many(self, records):
+        """
+        Adiciona locais ao gazetteer.
+
+        :param records: Sequência de tuplas ``(nome, lat, lon, cidade)``.
+        """
+        connection = self._connect()
+        with connection:
+            self._insert(connection, records)
+        connection.close()
+
+    def import_csv(self, path):
+        """Adiciona os locais de um CSV com as colunas ``name, lat, lon, city``."""
+        self.add_many(self._read_csv(path))
+
+    def lookup(self, name):
+        """Retorna ``(lat, lon)`` de um local, ou None se não estiver na tabela."""
+        connection = self._connect()
+        row = connection.execute(
+            "SELECT lat, lon FROM places WHERE key = ?", (normalize(name),)
+        ).fetchone()
+        connection.close()
+        return tuple(row) if row is not None else None
+
+    def nearest(self, lat, lon, tolerance=REVERSE_TOLERANCE):
+        """
+        Retorna o local mais próximo de ``(lat, lon)``.
+
+        :return: Dicionário com ``name``, ``lat``, ``lon`` e ``city``, ou
+            None se nenhum local estiver dentro da tolerância.
+        """
+        connection = self._connect()
+        rows = connection.execute(
+            "SELECT name, lat, lon, city FROM places "
+            "WHERE lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?",
+            (lat - tolerance, lat + tolerance, lon - tolerance, lon + tolerance),
+        ).fetchall()
+        connection.close()
+        if not rows:
+            return None
+        name, lat, lon, city = min(
+            rows, key=lambda row: math.hypot(row[1] - lat, row[2] - lon)
+        )
+        return {"name": name, "lat": lat, "lon": lon, "city": city}
+
+
+def _osmnx_geocode(query):
+    import osmnx as ox
+
+    return tuple(ox.geocode(query))
+
+
+def _nominatim_geocode(query):
+    from geopy.geocoders import Nominatim
+
+    location = Nominatim(user_agent="Aulas").geocode(query)
+    if location is None:
+        raise LookupError(f"Local não encontrado: {query}")
+    return location.latitude, location.longitude
+
+
+def _nominatim_reverse(lat, lon):
+    from geopy.geocoders import Nominatim
+
+    location = Nominatim(user_agent="Aulas").reverse(
+        (lat, lon), exactly_one=True, language="pt"
+    )
+    if location is None:
+        raise LookupError(f"Local não encontrado: {lat}, {lon}")
+    return {
+        "name": location.address,
+        "lat": lat,
+        "lon": lon,
+        "city": location.raw["address"].get("city"),
+    }
+
+
+BACKENDS = {"osmnx": _osmnx_geocode, "nominatim": _nominatim_geocode}
+
+
+class Geocoder:
+    """
+    Geocodificador em camadas: gazetteer local, cache persistente e serviço
+    online.
+
+    Consultas repetidas são respondidas pelo cache, sem acesso à rede, e as
+    já feitas no processo ficam também em memória. Com
+    ``offline=True`` (ou ``ASTROUFCG_OFFLINE=1``), locais fora do gazetteer
+    e do cache levantam ``LookupError``.
+
+    :param backend: Nome de um serviço em ``BACKENDS`` ou uma função que
+        recebe o nome do local e retorna ``(lat, lon)``.
+    :param reverse_backend: Função que recebe ``(lat, lon)`` e retorna um
+        dicionário com ``name``, ``lat``, ``lon`` e ``city``.
+    """
+
+    def __init__(
+        self,
+        gazetteer=None,
+        cache=None,
+        backend="osmnx",
+        reverse_backend=_nominatim_reverse,
+        offline=OFFLINE,
+    ):
+        self.gazetteer = gazetteer if gazetteer is not None else Gazetteer()
+        self.cache = cache if cache is not None else DiskCache("geocoding")
+        self.backend = BACKENDS[backend] if isinstance(backend, str) else backend
+        self.reverse_backend = reverse_backend
+        self.offline = offline
+        self._memo = {}
+
+    def geocode(self, query):
+        """Retorna ``(lat, lon)`` de um local."""
+        key = make_key("geocode", normalize(query))
+        if key not in self._memo:
+            self._memo[key] = self._geocode(query, key)
+        return self._memo[key]
+
+    def _geocode(self, query, key):
+        found = self.gazetteer.lookup(query)
+        if found is not None:
+            return found
+        found = self.cache.get(key)
+        if found is not None:
+            return tuple(found)
+        if self.offline:
+            raise LookupError(f"Local fora do gazetteer e do cache: {query}")
+        found = tuple(float(value) for value in self.backend(query))
+        self.cache.set(key, list(found))
+        return found
+
+    def reverse(self, lat, lon):
+        """Retorna o local conhecido mais próximo de ``(lat, lon)``."""
+        lat, lon = float(lat), float(lon)
+        key = make_key("reverse", round(lat, 4), round(lon, 4))
+        if key not in self._memo:
+            self._memo[key] = self._reverse(lat, lon, key)
+        return self._memo[key]
+
+    def _reverse(self, lat, lon, key):
+        found = self.gazetteer.nearest(lat, lon)
+        if found is not None:
+            return found
+        found = self.cache.get(key)
+        if found is not None:
+            return found
+        if self.offline:
+            raise LookupError(f"Local fora do gazetteer e do cache: {lat}, {lon}")
+        found = self.reverse_backend(lat, lon)
+        self.cache.set(key, found)
+        return found
+
+
+def set_geocoder(geocoder):
+    """Define o geocodificador usado por :func:`geocode` e :func:`reverse_geocode`."""
+    _default["geocoder"] = geocoder
+    return geocoder
+
+
+def get_geocoder():
+    """Retorna o geocodificador padrão do processo, criando-o se necessário."""
+    if _default["geocoder"] is None:
+        _default["geocoder"] = Geocoder()
+    return _default["geocoder"]
+
+
+def geocode(query):
+    """Retorna ``(lat, lon)`` de um local pelo geocodificador padrão."""
+    return get_geocoder().geocode(query)
+
+
+def reverse_geocode(lat, lon):
+    """Retorna o local mais próximo de ``(lat, lon)`` pelo geocodificador padrão."""
+    return get_geocoder().reverse(lat, lon)
+
+
+@lru_cache(maxsize=1)
+def get_timezone_finder():
+    """Retorna o ``TimezoneFinder`` do processo, criado no primeiro uso."""
+    from timezonefinder import TimezoneFinder
+
+    return TimezoneFinder()
+
+
+@lru_cache(maxsize=2**16)
+def _timezone_at(lat, lon):
+    return get_timezone_finder().timezone_at(lat=lat, lng=lon)
+
+
+def timezone_at(lat, lon):
+    """
+    Retorna o nome do fuso horário IANA de um local.
+
+    As coordenadas são arredondadas em ``TIMEZONE_DECIMALS`` casas antes da
+    consulta, de modo que fotos tiradas no mesmo lugar compartilham o cache.
+    """
+    return _timezone_at(
+        round(float(lat), TIMEZONE_DECIMALS), round(float(lon), TIMEZONE_DECIMALS)
+    )
+
+
+def timezones_at(lats, lons):
+    """
+    Retorna os fusos horários de vários locais.
+
+    Cada par de coordenadas distinto (após o arredondamento) é consultado
+    uma única vez.
+
+    :param lats: Latitudes em graus.
+    :param lons: Longitudes em graus.
+    :return: Array de nomes de fusos, do mesmo tamanho das entradas.
+    """
+    import numpy as np
+
+    points = np.column_stack(
+        [
+            np.round(np.ravel(np.asarray(lats, dtype=float)), TIMEZONE_DECIMALS),
+            np.round(np.ravel(np.asarray(lons, dtype=float)), TIMEZONE_DECIMALS),
+        ]
+    )
+    unique, inverse = np.unique(points, axis=0, return_inverse=True)
+    names = np.array([_timezone_at(lat, lon) for lat, lon in unique], dtype=object)
+    return names[np.ravel(inverse)]
@@ -0,0 +1,14 @@
+import importlib
+
+_submodules = {"aristarco", "eratostenes"}
+
+
+def __getattr__(name):
+    """Importa os submódulos apenas quando acessados."""
+    if name in _submodules:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted([*globals(), *_submodules])
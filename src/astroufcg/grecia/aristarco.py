@@ -1,147 +1,817 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+from warnings import warn
 from zoneinfo import ZoneInfo
 
-import astropy.units as u
-import exifread
-import matplotlib.pyplot as plt
 import numpy as np
-from matplotlib.patches import Circle
-from matplotlib_scalebar.scalebar import ScaleBar
-from scipy import optimize
-from skimage import exposure, img_as_float
-from skimage.draw import polygon_perimeter
-from skimage.filters import gaussian, threshold_otsu
-from skimage.measure import find_contours, perimeter
-from timezonefinder import TimezoneFinder
 
-from src.astroufcg.astronomy import setup
+from ..cache import DiskCache, make_key
+from ..geocoding import timezone_at
 
-path = "../../../"
-setup(path)
+#### Processamento de imagem
+EXIF_DTYPES = {
+    "file": "string",
+    "time": "datetime64[ns, UTC]",
+    "lat": "float64",
+    "lon": "float64",
+    "exposure_time": "float64",
+    "author": "string",
+    "camera_model": "string",
+}
 
+exif_cache = DiskCache("exif")
+
+
+class DiskFit(NamedTuple):
+    """Disco ajustado em duas resoluções, em pixels da imagem original."""
+
+    coarse: np.ndarray  # (raio, centro_x, centro_y) da imagem reduzida
+    refined: np.ndarray  # (raio, centro_x, centro_y) refinado na borda
+    rms: float  # resíduo rms do ajuste refinado, em pixels
+    points: int  # pontos de borda usados no ajuste refinado
+    std: np.ndarray = None  # desvio padrão bootstrap do ajuste refinado
+
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".tif", ".tiff"}
+DISK_COLUMNS = [
+    "radius",
+    "center_x",
+    "center_y",
+    "rms",
+    "points",
+    "coarse_radius",
+    "coarse_center_x",
+    "coarse_center_y",
+]
+DISK_STATUS = ("ok", "unreadable", "no_disk", "poor_fit")
+
+
+def _ratio(value):
+    return float(value.num) / float(value.den)
 
-#### Processamento de imagem
-def read_exif(filename):
-    """Lê os metadados EXIF de uma imagem."""
-    tags = exifread.process_file(open(filename, "rb"))
-
-    # the following functions will help us get GPS data from the EXIF data if it exists
-    def _convert_to_degress(value):
-        """
-        Helper function to convert the GPS coordinates stored in the EXIF to degress in float format
-        :param value:
-        :type value: exifread.utils.Ratio
-        :rtype: float
-        """
-        d = float(value.values[0].num) / float(value.values[0].den)
-        m = float(value.values[1].num) / float(value.values[1].den)
-        s = float(value.values[2].num) / float(value.values[2].den)
-
-        return d + (m / 60.0) + (s / 3600.0)
-
-    def get_exif_location(exif_data):
-        """
-        Returns the latitude and longitude, if available, from the provided exif_data (obtained through get_exif_data above)
-        """
-        lat = None
-        lon = None
-
-        gps_latitude = exif_data.get("GPS GPSLatitude", None)
-        gps_latitude_ref = exif_data.get("GPS GPSLatitudeRef", None)
-        gps_longitude = exif_data.get("GPS GPSLongitude", None)
-        gps_longitude_ref = exif_data.get("GPS GPSLongitudeRef", None)
-
-        if gps_latitude and gps_latitude_ref and gps_longitude and gps_longitude_ref:
-            lat = _convert_to_degress(gps_latitude)
-            if gps_latitude_ref.values[0] != "N":
-                lat = 0 - lat
-
-            lon = _convert_to_degress(gps_longitude)
-            if gps_longitude_ref.values[0] != "E":
-                lon = 0 - lon
-
-        return lat, lon
-
-    if "EXIF ExposureTime" in tags:
-        exposure_tag = tags["EXIF ExposureTime"]
-        exposure_time = exposure_tag.values[0].num / exposure_tag.values[0].den * u.s
-    if "Image Artist" in tags:
-        author_str = tags["Image Artist"].values
-
-    lat, lon = get_exif_location(tags)
-    if (lat is not None) and (lon is not None):
-        gps = [lat, lon] * u.deg
-
-    tf = TimezoneFinder()
-    tzone = ZoneInfo(tf.timezone_at(lat=lat, lng=lon))
-
-    if "EXIF DateTimeOriginal" in tags:
-        datetime_str = tags["EXIF DateTimeOriginal"].values.replace(" ", ":").split(":")
-        time = datetime(
-            int(datetime_str[0]),
-            int(datetime_str[1]),
-            int(datetime_str[2]),
-            int(datetime_str[3]),
-            int(datetime_str[4]),
-            int(datetime_str[5]),
-            tzinfo=tzone,
-        ).astimezone(ZoneInfo("UTC"))
-    if "Image Model" in tags:
-        camera_model_str = tags["Image Model"].values
 
+def _exif_location(tags):
+    """Latitude e longitude em graus, ou ``(None, None)`` se não houver GPS."""
+    try:
+        lat_tag, lat_ref = tags["GPS GPSLatitude"], tags["GPS GPSLatitudeRef"]
+        lon_tag, lon_ref = tags["GPS GPSLongitude"], tags["GPS GPSLongitudeRef"]
+    except KeyError:
+        return None, None
+
+    def degrees(tag):
+        d, m, s = (_ratio(value) for value in tag.values[:3])
+        return d + m / 60.0 + s / 3600.0
+
+    lat = degrees(lat_tag) * (1 if str(lat_ref.values).startswith("N") else -1)
+    lon = degrees(lon_tag) * (1 if str(lon_ref.values).startswith("E") else -1)
+    return lat, lon
+
+
+def _exif_time(tags, lat, lon, timezone=None):
+    """
+    Instante da foto em UTC.
+
+    O fuso vem de ``OffsetTimeOriginal``, se houver; senão, das coordenadas
+    GPS; senão, de ``timezone``. Sem nenhum dos três o horário local da
+    câmera não pode ser convertido: emite um aviso e retorna None.
+    """
+    tag = tags.get("EXIF DateTimeOriginal") or tags.get("Image DateTime")
+    if tag is None:
+        return None
+    try:
+        local = datetime.strptime(str(tag.values).strip(), "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+    offset = tags.get("EXIF OffsetTimeOriginal")
+    if offset is not None:
+        tzone = datetime.strptime(str(offset.values).strip(), "%z").tzinfo
+    elif lat is not None and lon is not None:
+        tzone = ZoneInfo(timezone_at(lat, lon))
+    elif timezone is not None:
+        tzone = ZoneInfo(timezone) if isinstance(timezone, str) else timezone
+    else:
+        warn(
+            "Foto sem OffsetTimeOriginal nem GPS: informe timezone para "
+            "converter o horário local da câmera em UTC.",
+            stacklevel=3,
+        )
+        return None
+    return local.replace(tzinfo=tzone).astimezone(ZoneInfo("UTC"))
+
+
+def _exif_text(tags, name):
+    tag = tags.get(name)
+    return str(tag.values).strip() if tag is not None else None
+
+
+def read_exif_header(filename, timezone=None):
+    """
+    Lê os metadados EXIF de uma imagem, sem unidades.
+
+    Só o cabeçalho é processado (sem makernotes nem miniatura), e campos
+    ausentes resultam em None.
+
+    :param filename: Caminho da imagem.
+    :param timezone: Fuso do relógio da câmera (nome IANA ou ``tzinfo``),
+        usado quando a foto não traz ``OffsetTimeOriginal`` nem GPS.
+    :return: Dicionário com ``exposure_time`` (s), ``author``, ``lat``,
+        ``lon``, ``time`` (UTC) e ``camera_model``.
+    """
+    import exifread
+
+    with open(filename, "rb") as file:
+        tags = exifread.process_file(file, details=False, extract_thumbnail=False)
+    lat, lon = _exif_location(tags)
+    exposure = tags.get("EXIF ExposureTime")
     return {
-        "exposure_time": exposure_time,
-        "author": author_str,
+        "exposure_time": _ratio(exposure.values[0]) if exposure is not None else None,
+        "author": _exif_text(tags, "Image Artist"),
         "lat": lat,
         "lon": lon,
-        "time": time,
-        "camera_model": camera_model_str,
+        "time": _exif_time(tags, lat, lon, timezone),
+        "camera_model": _exif_text(tags, "Image Model"),
     }
 
 
-def get_disk(data, sigma=11, plot=False, ax=None, figsize=(16, 10)):
+def read_exif(filename, timezone=None):
+    """Lê os metadados EXIF de uma imagem; ver :func:`read_exif_header`."""
+    import astropy.units as u
+
+    metadata = read_exif_header(filename, timezone)
+    if metadata["exposure_time"] is not None:
+        metadata["exposure_time"] = metadata["exposure_time"] * u.s
+    return metadata
+
+
+def _exif_record(path, timezone=None):
+    try:
+        metadata = read_exif_header(path, timezone)
+    except (OSError, ValueError, KeyError, IndexError, ZeroDivisionError) as error:
+        warn(f"Não foi possível ler o EXIF de {path}: {error}", stacklevel=3)
+        return None
+    time = metadata["time"]
+    metadata["time"] = time.isoformat() if time is not None else None
+    return metadata
+
+
+def read_exif_batch(filenames, workers=8, cache=True, timezone=None):
     """
-    Obtém o disco solar a partir dos dados de uma imagem.
+    Lê os metadados EXIF de uma coleção de imagens.
 
-    :param data: Dados da imagem.
-    :param sigma: Desvio padrão para o filtro gaussiano.
-    :param plot: Se True, plota o disco solar.
-    :return: Disco solar.
+    Os arquivos são lidos em paralelo por ``workers`` threads, e os
+    resultados ficam no cache persistente, indexados pelo caminho, data de
+    modificação e tamanho de cada arquivo: só são relidos os que mudaram.
+
+    :param filenames: Caminhos das imagens.
+    :param workers: Número de threads.
+    :param cache: Se True, usa o cache persistente.
+    :param timezone: Fuso do relógio da câmera para fotos sem
+        ``OffsetTimeOriginal`` nem GPS; ver :func:`read_exif_header`.
+    :return: DataFrame com uma linha por imagem e as colunas de
+        ``EXIF_DTYPES``; campos ausentes ficam nulos.
     """
-    image = img_as_float(data)
+    import pandas as pd
+
+    paths = [Path(filename).resolve() for filename in filenames]
+    keys = []
+    for path in paths:
+        stat = path.stat()
+        keys.append(
+            make_key(
+                "exif", path.as_posix(), stat.st_mtime_ns, stat.st_size, str(timezone)
+            )
+        )
+    found = exif_cache.get_many(keys) if cache else {}
+    missing = [i for i, key in enumerate(keys) if key not in found]
+    if missing:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            records = list(
+                executor.map(
+                    _exif_record,
+                    [paths[i] for i in missing],
+                    [timezone] * len(missing),
+                )
+            )
+        new = {keys[i]: record for i, record in zip(missing, records) if record}
+        if cache:
+            exif_cache.set_many(new)
+        found.update(new)
+
+    empty = dict.fromkeys(EXIF_DTYPES)
+    df = pd.DataFrame([{**empty, **found.get(key, {})} for key in keys])
+    df["file"] = [path.as_posix() for path in paths]
+    df["time"] = pd.to_datetime(df["time"], utc=True, format="ISO8601")
+    return df[list(EXIF_DTYPES)].astype(EXIF_DTYPES)
+
+
+def _disk_mask(image, sigma, equalize=False):
+    """
+    Suaviza e binariza a imagem pelo limiar de Otsu.
+
+    Com ``equalize=True`` o histograma é equalizado antes, como na versão
+    original; num disco pequeno sobre céu escuro a equalização realça o
+    ruído do céu, e a máscara junta disco e fundo.
+    """
+    from skimage import exposure
+    from skimage.filters import gaussian, threshold_otsu
 
-    if image.ndim == 3:
-        # Convert to grayscale if the image is RGB
-        image = np.mean(image, axis=-1)
     # Histogram Equalize
-    img_equalized = exposure.equalize_hist(image)
+    img_equalized = exposure.equalize_hist(image) if equalize else image
     # Gaussian Blur
     blurred = gaussian(img_equalized, sigma=sigma)
     # Otsu Thresholding
     mask = threshold_otsu(blurred)
     binary = blurred > mask
-    contours = find_contours(binary, 0.5)
+    return img_equalized, blurred, binary
+
+
+def _fit_all_contours(contours, shape):
+    """
+    Ajusta um círculo a cada contorno, como na versão original.
+
+    O ajuste minimiza a distância geométrica ao círculo, em coordenadas de
+    imagem (``x`` coluna, ``y`` linha), de modo que raio e centro são ambos
+    ajustados.
+    """
+    from skimage.draw import polygon_perimeter
+    from skimage.measure import perimeter
 
     results = []
-    for i, contour in enumerate(contours):
-        contour_img = np.zeros_like(binary, dtype=bool)
+    for contour in contours:
+        contour_img = np.zeros(shape, dtype=bool)
         rr, cc = polygon_perimeter(contour[:, 0], contour[:, 1])
         contour_img[rr, cc] = True
 
         _center = contour.mean(axis=0)
         _radius = perimeter(contour_img) / (2 * np.pi)
-        YY, XX = contour[:, 1], contour[:, 0]
+        x, y = contour[:, 1], contour[:, 0]
         params, _ = fit_leastsq(
-            XX,
-            YY,
+            x,
+            y,
             circle_model,
-            circle_jacobian,
-            circle_norm,
+            circle_distance_jacobian,
+            circle_distance,
             guess=[_radius, _center[1], _center[0]],
         )
         results.append(params)
+    return results
+
+
+def _fit_best_contour(contours, min_points=100, max_residual=0.05):
+    """
+    Ajusta apenas o melhor candidato a disco entre os contornos.
+
+    Contornos com menos de ``min_points`` pontos são descartados; os demais
+    recebem um ajuste algébrico, e o de maior raio entre os que têm resíduo
+    relativo até ``max_residual`` é refinado pelo ajuste geométrico. Se
+    nenhum contorno se qualifica, emite um aviso e retorna NaN.
+    """
+    best = None
+    for contour in contours:
+        if len(contour) < min_points:
+            continue
+        x, y = contour[:, 1], contour[:, 0]
+        guess = fit_circle_algebraic(x, y)
+        residual = np.std(circle_model(guess, x, y) - guess[0]) / guess[0]
+        if residual <= max_residual and (best is None or guess[0] > best[2][0]):
+            best = (x, y, guess)
+
+    if best is None:
+        warn(
+            f"Nenhum contorno com ao menos {min_points} pontos e resíduo "
+            f"relativo até {max_residual} parece um disco.",
+            stacklevel=3,
+        )
+        return [np.full(3, np.nan)]
+
+    x, y, guess = best
+    params, _ = fit_leastsq(
+        x, y, circle_model, circle_distance_jacobian, circle_distance, guess=guess
+    )
+    return [params]
+
+
+def _as_gray(image):
+    from skimage import img_as_float
+
+    image = img_as_float(image)
+    if image.ndim == 3:
+        # Convert to grayscale if the image is RGB
+        image = np.mean(image, axis=-1)
+    return image
+
+
+def _pyramid(image, downscale):
+    """
+    Pirâmide gaussiana da imagem, da resolução original à ``downscale`` vezes menor.
+
+    Cada nível é reduzido do anterior por um fator de até 2 com
+    :func:`skimage.transform.pyramid_reduce`, que suaviza antes de
+    amostrar (anti-aliasing).
+
+    :return: Lista de pares ``(imagem, fator)``, do nível mais fino ao mais
+        grosso; ``fator`` é a razão ``(linhas, colunas)`` entre a imagem
+        original e o nível.
+    """
+    from skimage.transform import pyramid_reduce
+
+    levels = [image]
+    remaining = float(downscale)
+    while remaining > 1 + 1e-9:
+        step = min(2.0, remaining)
+        levels.append(pyramid_reduce(levels[-1], downscale=step))
+        remaining /= step
+    shape = np.array(image.shape[:2], dtype=float)
+    return [(level, shape / level.shape[:2]) for level in levels]
+
+
+def _to_level(params, factor):
+    """Círculo da imagem original no nível de fator ``(linhas, colunas)``."""
+    r, cx, cy = params
+    return np.array(
+        [r / factor.mean(), (cx + 0.5) / factor[1] - 0.5, (cy + 0.5) / factor[0] - 0.5]
+    )
+
+
+def _to_original(params, factor):
+    """Círculo de um nível de fator ``(linhas, colunas)`` na imagem original."""
+    r, cx, cy = params
+    return np.array(
+        [r * factor.mean(), (cx + 0.5) * factor[1] - 0.5, (cy + 0.5) * factor[0] - 0.5]
+    )
+
+
+def _coarse_disk(data, downscale, sigma, min_points, max_residual, equalize=False):
+    """
+    Detecta o disco no nível mais grosso de uma pirâmide da imagem.
+
+    O filtro gaussiano usa ``sigma / downscale`` e ``min_points``, dado em
+    pontos da imagem original, é dividido por ``downscale``. Um círculo com
+    centro fora da imagem ou raio maior que ela é descartado com um aviso,
+    e os parâmetros ficam NaN.
+
+    :return: Níveis da pirâmide (ver :func:`_pyramid`), etapas da máscara no
+        nível mais grosso e parâmetros na escala original.
+    """
+    from skimage.measure import find_contours
+
+    data = np.asarray(data)
+    levels = _pyramid(_as_gray(data), downscale)
+    image, factor = levels[-1]
+    stages = _disk_mask(image, max(sigma / downscale, 0.5), equalize)
+    contours = find_contours(stages[-1], 0.5)
+    min_points = max(int(min_points / downscale), 8)
+    params = _to_original(
+        _fit_best_contour(contours, min_points, max_residual)[0], factor
+    )
+
+    r, cx, cy = params
+    height, width = data.shape[:2]
+    if np.isfinite(r) and not (
+        0 < r <= max(height, width) and 0 <= cx < width and 0 <= cy < height
+    ):
+        warn(
+            f"Círculo grosseiro fora da imagem (raio {r:.0f}, centro "
+            f"({cx:.0f}, {cy:.0f})); o disco não foi encontrado.",
+            stacklevel=3,
+        )
+        params = np.full(3, np.nan)
+    return levels, stages, params
+
+
+def _pyramid_fit(
+    data,
+    downscale=8,
+    sigma=11,
+    width=4,
+    n_rays=None,
+    min_points=100,
+    max_residual=0.05,
+    equalize=False,
+):
+    """
+    Detecta o disco no nível grosso e o refina nível a nível.
+
+    Em cada nível intermediário o círculo é refinado por
+    :func:`_refine_disk` numa coroa de ``width`` pixels do próprio nível;
+    no fim, o mesmo é feito na imagem original.
+
+    :return: Níveis, etapas da máscara, parâmetros grosseiros e o resultado
+        de :func:`_refine_disk` na imagem original (None se o disco não
+        foi encontrado).
+    """
+    levels, stages, coarse = _coarse_disk(
+        data, downscale, sigma, min_points, max_residual, equalize
+    )
+    if np.isnan(coarse).any():
+        return levels, stages, coarse, None
+    params = coarse
+    for image, factor in levels[-2:0:-1]:
+        level_params = _refine_disk(image, _to_level(params, factor), width)[0]
+        params = _to_original(level_params, factor)
+    return levels, stages, coarse, _refine_disk(data, params, width, n_rays)
+
+
+def _refine_disk(data, guess, width, n_rays=None, smooth=1.0):
+    """
+    Refina um círculo na imagem original, perto da borda estimada.
+
+    A imagem é amostrada apenas ao longo de raios que cruzam a borda, numa
+    coroa de ``2 * width + 1`` pixels; em cada raio, a borda é o máximo do
+    gradiente, com interpolação parabólica. Pontos a mais de três desvios
+    (MAD) do primeiro ajuste são descartados antes do ajuste final.
+
+    :param data: Imagem original, em tons de cinza ou RGB.
+    :param guess: Parâmetros iniciais (raio, centro_x, centro_y).
+    :param width: Meia largura da coroa, em pixels.
+    :param n_rays: Número de raios; se None, um por pixel do perímetro.
+    :param smooth: Desvio padrão da suavização ao longo de cada raio.
+    :return: Parâmetros refinados, resíduo rms e coordenadas dos pontos de
+        borda usados no ajuste.
+    """
+    from scipy.ndimage import gaussian_filter1d, map_coordinates
+
+    data = np.asarray(data)
+    r, cx, cy = guess
+    if n_rays is None:
+        n_rays = int(np.ceil(2 * np.pi * r))
+    theta = np.linspace(0, 2 * np.pi, n_rays, endpoint=False)
+    radii = r + np.arange(-width, width + 1)
+    cos, sin = np.cos(theta)[:, None], np.sin(theta)[:, None]
+    rows, cols = cy + radii * sin, cx + radii * cos
+
+    inside = (
+        (rows.min(axis=1) >= 0)
+        & (rows.max(axis=1) <= data.shape[0] - 1)
+        & (cols.min(axis=1) >= 0)
+        & (cols.max(axis=1) <= data.shape[1] - 1)
+    )
+    coords = np.stack([rows[inside], cols[inside]])
+    if data.ndim == 3:
+        profiles = np.mean(
+            [
+                map_coordinates(data[..., k], coords, order=1, output=np.float64)
+                for k in range(data.shape[-1])
+            ],
+            axis=0,
+        )
+    else:
+        profiles = map_coordinates(data, coords, order=1, output=np.float64)
+
+    gradient = np.abs(np.diff(gaussian_filter1d(profiles, smooth, axis=1), axis=1))
+    index = np.clip(np.argmax(gradient, axis=1), 1, gradient.shape[1] - 2)
+    g0, g1, g2 = np.take_along_axis(
+        gradient, index[:, None] + np.array([-1, 0, 1]), axis=1
+    ).T
+    denominator = g0 - 2 * g1 + g2
+    delta = np.where(denominator != 0, 0.5 * (g0 - g2) / denominator, 0.0)
+    edge = radii[0] + index + 0.5 + np.clip(delta, -0.5, 0.5)
+
+    x = cx + edge * cos[inside, 0]
+    y = cy + edge * sin[inside, 0]
+    params = fit_circle_algebraic(x, y)
+    for _ in range(2):
+        params, residuals = fit_leastsq(
+            x, y, circle_model, circle_distance_jacobian, circle_distance, params
+        )
+        deviation = np.median(np.abs(residuals - np.median(residuals)))
+        keep = np.abs(residuals) <= 3 * 1.4826 * deviation + 0.5
+        x, y = x[keep], y[keep]
+    params, residuals = fit_leastsq(
+        x, y, circle_model, circle_distance_jacobian, circle_distance, params
+    )
+    return params, float(np.sqrt(np.mean(residuals**2))), x, y
+
+
+def find_disk_pyramid(
+    data,
+    downscale=8,
+    sigma=11,
+    width=4,
+    n_rays=None,
+    min_points=100,
+    max_residual=0.05,
+    n_boot=0,
+    equalize=False,
+):
+    """
+    Localiza o disco da resolução grosseira para a fina.
+
+    O disco é detectado no nível mais grosso de uma pirâmide gaussiana,
+    ``downscale`` vezes menor que a imagem, e refinado nível a nível até a
+    imagem original; em cada nível só uma coroa em torno da borda é
+    amostrada, de modo que o refinamento cresce com o perímetro do disco,
+    não com a área da imagem.
+
+    :param data: Dados da imagem.
+    :param downscale: Fator de redução do nível mais grosso.
+    :param sigma: Desvio padrão do filtro gaussiano, em pixels da imagem original.
+    :param width: Meia largura da coroa de refinamento, em pixels de cada nível.
+    :param n_rays: Número de raios do refinamento final; se None, um por
+        pixel do perímetro.
+    :param min_points: Número mínimo de pontos de um contorno, em pontos da
+        imagem original (o mesmo critério de :func:`get_disk`).
+    :param max_residual: Resíduo relativo máximo de um candidato.
+    :param n_boot: Se positivo, estima o desvio padrão do ajuste refinado
+        com ``n_boot`` amostras bootstrap dos pontos de borda (ver
+        :func:`circle_uncertainty`).
+    :param equalize: Se True, equaliza o histograma antes do limiar de Otsu.
+    :return: :class:`DiskFit` com os parâmetros grosseiros e refinados;
+        se o disco não for encontrado, os parâmetros refinados são NaN e
+        ``points`` é 0.
+    """
+    _, _, coarse, result = _pyramid_fit(
+        data, downscale, sigma, width, n_rays, min_points, max_residual, equalize
+    )
+    if result is None:
+        return DiskFit(coarse, np.full(3, np.nan), np.nan, 0)
+    refined, rms, x, y = result
+    std = circle_uncertainty(x, y, n_boot).std if n_boot else None
+    return DiskFit(coarse, refined, rms, x.size, std)
+
+
+def _image_files(images, pattern="*"):
+    """Arquivos de imagem de uma lista de caminhos e diretórios, ordenados."""
+    if isinstance(images, (str, os.PathLike)):
+        images = [images]
+    files = []
+    for item in map(Path, images):
+        if item.is_dir():
+            files.extend(
+                sorted(
+                    path
+                    for path in item.glob(pattern)
+                    if path.suffix.lower() in IMAGE_SUFFIXES
+                )
+            )
+        else:
+            files.append(item)
+    return files
+
+
+def _measure_disk_file(
+    path,
+    downscale=8,
+    sigma=11,
+    preview_dir=None,
+    max_rms=0.01,
+    min_coverage=0.5,
+):
+    """
+    Decodifica uma imagem e mede o disco; devolve só os números.
+
+    O ajuste é rejeitado (``"poor_fit"``) se o resíduo rms passa de
+    ``max_rms`` vezes o raio ou se os pontos de borda cobrem menos de
+    ``min_coverage`` do perímetro; raio e centro ficam NaN, mas o resíduo,
+    os pontos e o círculo grosseiro são mantidos para diagnóstico.
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(path) as image:
+            data = np.asarray(image.convert("L"))
+        fit = find_disk_pyramid(data, downscale=downscale, sigma=sigma)
+    except (OSError, ValueError, np.linalg.LinAlgError) as error:
+        warn(f"Não foi possível medir o disco em {path}: {error}", stacklevel=2)
+        return {**dict.fromkeys(DISK_COLUMNS, np.nan), "status": "unreadable"}
+
+    refined = fit.refined
+    status = "ok"
+    if np.isnan(refined).any():
+        status = "no_disk"
+    elif (
+        fit.rms > max_rms * refined[0]
+        or fit.points < min_coverage * 2 * np.pi * refined[0]
+    ):
+        status = "poor_fit"
+        warn(
+            f"Ajuste rejeitado em {path}: raio {refined[0]:.1f} px, rms "
+            f"{fit.rms:.2f} px, {fit.points} pontos de borda.",
+            stacklevel=2,
+        )
+        refined = np.full(3, np.nan)
+    if preview_dir is not None:
+        save_preview(
+            Path(preview_dir) / f"{Path(path).stem}.png",
+            [data],
+            [Path(path).name],
+            [fit.coarse, fit.refined],
+            figsize=(6, 6),
+        )
+    values = dict(zip(DISK_COLUMNS, [*refined, fit.rms, fit.points, *fit.coarse]))
+    return {**values, "status": status}
+
+
+def measure_disks(
+    images,
+    output=None,
+    workers=None,
+    downscale=8,
+    sigma=11,
+    pattern="*",
+    chunk_size=64,
+    preview_dir=None,
+    max_rms=0.01,
+    min_coverage=0.5,
+    timezone=None,
+):
+    """
+    Mede o disco do Sol ou da Lua numa sequência de imagens.
+
+    Cada imagem é decodificada e medida por :func:`find_disk_pyramid` num
+    processo separado, e só os parâmetros voltam ao processo principal:
+    a memória ocupada cresce com o número de processos, não com o de
+    imagens. Os instantes vêm de :func:`read_exif_batch`.
 
+    :param images: Caminho ou lista de caminhos de imagens ou diretórios.
+    :param output: Arquivo Parquet de saída. Se informado, os resultados são
+        gravados em blocos de ``chunk_size`` imagens à medida que ficam prontos.
+    :param workers: Número de processos; 1 executa no processo atual.
+    :param downscale: Fator de redução da etapa grosseira.
+    :param sigma: Desvio padrão do filtro gaussiano.
+    :param pattern: Padrão de nomes usado nos diretórios.
+    :param chunk_size: Número de imagens por bloco gravado.
+    :param preview_dir: Se informado, cada processo grava ali uma imagem
+        reduzida de cada quadro com os círculos grosseiro (vermelho) e
+        refinado (ciano), por :func:`save_preview`.
+    :param max_rms: Resíduo rms máximo aceito, como fração do raio.
+    :param min_coverage: Fração mínima do perímetro coberta por pontos de borda.
+    :param timezone: Fuso do relógio da câmera para fotos sem fuso nem GPS.
+    :return: DataFrame com ``file``, ``time``, as colunas de
+        ``DISK_COLUMNS`` (em pixels) e ``status`` (um de ``DISK_STATUS``)
+        ou, se ``output`` for informado, o caminho do arquivo. Fora de
+        ``"ok"``, raio e centro ficam nulos.
+    """
+    import pandas as pd
+
+    files = _image_files(images, pattern)
+    if preview_dir is not None:
+        Path(preview_dir).mkdir(parents=True, exist_ok=True)
+    exif = read_exif_batch(files, timezone=timezone)[["file", "time"]]
+    workers = workers or min(len(files), os.cpu_count() or 1)
+
+    writer = None
+    executor = None
+    rows, frames = [], []
+    done = 0
+    try:
+        if workers <= 1:
+            results = (
+                _measure_disk_file(
+                    path, downscale, sigma, preview_dir, max_rms, min_coverage
+                )
+                for path in files
+            )
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            results = executor.map(
+                _measure_disk_file,
+                files,
+                [downscale] * len(files),
+                [sigma] * len(files),
+                [preview_dir] * len(files),
+                [max_rms] * len(files),
+                [min_coverage] * len(files),
+            )
+        for result in results:
+            rows.append(result)
+            if len(rows) < chunk_size and done + len(rows) < len(files):
+                continue
+            frame = pd.concat(
+                [
+                    exif.iloc[done : done + len(rows)].reset_index(drop=True),
+                    pd.DataFrame(rows, columns=DISK_COLUMNS, dtype="float64"),
+                    pd.Series(
+                        [row["status"] for row in rows], name="status", dtype="string"
+                    ),
+                ],
+                axis=1,
+            )
+            done += len(rows)
+            rows.clear()
+            if output is None:
+                frames.append(frame)
+                continue
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(Path(output), table.schema)
+            writer.write_table(table)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if writer is not None:
+            writer.close()
+
+    if output is not None:
+        return Path(output)
+    if not frames:
+        return pd.DataFrame(columns=["file", "time", *DISK_COLUMNS, "status"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def get_disk(
+    data,
+    sigma=11,
+    plot=False,
+    ax=None,
+    figsize=(16, 10),
+    method="all",
+    min_points=100,
+    max_residual=0.05,
+    downscale=8,
+    max_size=None,
+    preview=None,
+    background=False,
+    equalize=False,
+):
+    """
+    Obtém o disco solar a partir dos dados de uma imagem.
+
+    Com ``method="all"`` cada contorno da máscara é ajustado por um círculo.
+    Com ``method="fast"`` os contornos pequenos são descartados, os demais
+    são estimados por um ajuste algébrico em forma fechada e só o melhor
+    candidato é refinado. Com ``method="pyramid"`` o modo rápido roda no
+    nível mais grosso de uma pirâmide ``downscale`` vezes menor e o círculo
+    é refinado nível a nível até a imagem original (ver
+    :func:`find_disk_pyramid`); as figuras mostram o nível mais grosso. Em
+    todos os modos os parâmetros seguem as coordenadas da imagem, com
+    ``centro_x`` na coluna e ``centro_y`` na linha.
+
+    A máscara é o limiar de Otsu da imagem suavizada; a equalização de
+    histograma da versão original só é aplicada com ``equalize=True``.
+
+    :param data: Dados da imagem.
+    :param sigma: Desvio padrão para o filtro gaussiano.
+    :param plot: Se True, plota o disco solar.
+    :param method: ``"all"``, ``"fast"`` ou ``"pyramid"``.
+    :param min_points: Número mínimo de pontos de um contorno no modo rápido.
+    :param max_residual: Resíduo relativo máximo de um candidato no modo rápido.
+    :param downscale: Fator de redução do modo ``"pyramid"``.
+    :param max_size: Lado máximo, em pixels, das imagens desenhadas com
+        ``plot=True``; se None, desenha na resolução da análise.
+    :param preview: Arquivo em que gravar as etapas e os círculos ajustados
+        com :func:`save_preview`, sem interface gráfica.
+    :param background: Se True, ``preview`` é gravado em segundo plano.
+    :param equalize: Se True, equaliza o histograma antes do limiar.
+    :return: Lista de parâmetros ``(raio, centro_x, centro_y)``, eixos e figura.
+    """
+    from skimage.measure import find_contours
+
+    if method not in ("all", "fast", "pyramid"):
+        raise ValueError(
+            f"Método desconhecido: {method!r} (use 'all', 'fast' ou 'pyramid')."
+        )
+
+    scale = 1
+    if method == "pyramid":
+        levels, stages, coarse, result = _pyramid_fit(
+            data,
+            downscale,
+            sigma,
+            min_points=min_points,
+            max_residual=max_residual,
+            equalize=equalize,
+        )
+        image = levels[-1][0]
+        img_equalized, blurred, binary = stages
+        results = [coarse if result is None else result[0]]
+        scale = downscale
+    else:
+        image = _as_gray(data)
+        img_equalized, blurred, binary = _disk_mask(image, sigma, equalize)
+        contours = find_contours(binary, 0.5)
+        if method == "fast":
+            results = _fit_best_contour(contours, min_points, max_residual)
+        else:
+            results = _fit_all_contours(contours, binary.shape)
+
+    stages = [image, img_equalized, blurred, binary]
+    titles = [
+        "Original Image",
+        "Histogram Equalized" if equalize else "Grayscale",
+        "Gaussian Blurred",
+        "Binary Mask",
+    ]
+    if preview is not None:
+        save_preview(
+            preview,
+            stages,
+            titles,
+            results,
+            scale=scale,
+            background=background,
+        )
+
+    fig = None
     if plot:
+        from matplotlib.patches import Circle
+
         circles_patches = [
             Circle((param[1], param[2]), radius=param[0], color="red", fill=False)
             for param in results
@@ -155,43 +825,157 @@ def get_disk(data, sigma=11, plot=False, ax=None, figsize=(16, 10)):
         ]
 
         ax, fig = plot_images(
-            [image, img_equalized, blurred, binary],
-            titles=[
-                "Original Image",
-                "Histogram Equalized",
-                "Gaussian Blurred",
-                "Binary Mask",
-            ],
+            stages,
+            titles=titles,
             patches=patches,
             figsize=figsize,
+            ax=ax,
+            max_size=max_size,
+            scale=scale,
         )
 
     return results, ax, fig
 
 
-def fit_leastsq(x, y, model, jac, norm, guess):
+def fit_circle_algebraic(x, y):
+    """
+    Ajuste algébrico de um círculo (método de Kåsa), em forma fechada.
+
+    Resolve ``x² + y² = 2 cx x + 2 cy y + c`` por mínimos quadrados lineares
+    (equações normais), com as coordenadas centradas na média para manter o
+    sistema bem condicionado. Serve de chute inicial para :func:`fit_leastsq`.
+
+    :param x: Coordenadas x dos pontos.
+    :param y: Coordenadas y dos pontos.
+    :return: Parâmetros do círculo (raio, centro_x, centro_y).
+    """
+    features, x0, y0 = _kasa_features(x, y)
+    return _kasa_solve(features.sum(axis=0), x0, y0)
+
+
+def _kasa_features(x, y):
+    """Termos das equações normais do ajuste de Kåsa, centrados na média."""
+    x0, y0 = x.mean(), y.mean()
+    u, v = x - x0, y - y0
+    z = u * u + v * v
+    features = np.stack([u * u, u * v, u, v * v, v, np.ones_like(u), u * z, v * z, z])
+    return features.T, x0, y0
+
+
+def _kasa_solve(sums, x0, y0):
+    """Resolve em lote as equações normais a partir das somas ``(..., 9)``."""
+    suu, suv, su, svv, sv, s1, suz, svz, sz = np.moveaxis(sums, -1, 0)
+    matrix = np.stack(
+        [
+            np.stack([suu, suv, su], axis=-1),
+            np.stack([suv, svv, sv], axis=-1),
+            np.stack([su, sv, s1], axis=-1),
+        ],
+        axis=-2,
+    )
+    a, b, c = np.moveaxis(
+        np.linalg.solve(matrix, np.stack([suz, svz, sz], axis=-1)[..., None])[..., 0],
+        -1,
+        0,
+    )
+    cx, cy = a / 2, b / 2
+    return np.stack([np.sqrt(c + cx**2 + cy**2), cx + x0, cy + y0], axis=-1)
+
+
+class CircleUncertainty(NamedTuple):
+    """Incerteza dos parâmetros (raio, centro_x, centro_y) de um círculo."""
+
+    params: np.ndarray  # ajuste algébrico com todos os pontos
+    std: np.ndarray  # desvio padrão de cada parâmetro
+    low: np.ndarray  # limite inferior do intervalo de confiança
+    high: np.ndarray  # limite superior do intervalo de confiança
+    samples: np.ndarray  # (n_amostras, 3) parâmetros reamostrados
+
+
+def circle_uncertainty(
+    x, y, n_boot=1000, method="bootstrap", confidence=0.95, seed=None
+):
+    """
+    Incerteza do ajuste de um círculo por bootstrap ou jackknife.
+
+    Os pontos do contorno são reamostrados e cada amostra é ajustada pelo
+    método algébrico de Kåsa. Todas as amostras são resolvidas de uma vez:
+    o bootstrap usa pesos multinomiais, de modo que as equações normais de
+    todas as amostras saem de um único produto de matrizes, e o jackknife
+    subtrai cada ponto das somas totais.
+
+    :param x: Coordenadas x dos pontos.
+    :param y: Coordenadas y dos pontos.
+    :param n_boot: Número de amostras do bootstrap.
+    :param method: ``"bootstrap"`` ou ``"jackknife"``.
+    :param confidence: Nível de confiança do intervalo.
+    :param seed: Semente do gerador aleatório.
+    :return: :class:`CircleUncertainty`. O intervalo do bootstrap é o de
+        percentis; o do jackknife usa a aproximação normal.
+    """
+    from statistics import NormalDist
+
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    features, x0, y0 = _kasa_features(x, y)
+    total = features.sum(axis=0)
+    params = _kasa_solve(total, x0, y0)
+    alpha = (1 - confidence) / 2
+
+    if method == "bootstrap":
+        rng = np.random.default_rng(seed)
+        # Contagem de cada ponto em cada amostra (pesos multinomiais).
+        index = rng.integers(0, x.size, (n_boot, x.size))
+        index += x.size * np.arange(n_boot)[:, None]
+        weights = np.bincount(index.ravel(), minlength=n_boot * x.size)
+        weights = weights.reshape(n_boot, x.size)
+        samples = _kasa_solve(weights @ features, x0, y0)
+        std = samples.std(axis=0, ddof=1)
+        low, high = np.quantile(samples, [alpha, 1 - alpha], axis=0)
+    elif method == "jackknife":
+        samples = _kasa_solve(total - features, x0, y0)
+        n = x.size
+        deviation = samples - samples.mean(axis=0)
+        std = np.sqrt((n - 1) / n * np.sum(deviation**2, axis=0))
+        z = NormalDist().inv_cdf(1 - alpha)
+        low, high = params - z * std, params + z * std
+    else:
+        raise ValueError(
+            f"Método desconhecido: {method!r} (use 'bootstrap' ou 'jackknife')."
+        )
+    return CircleUncertainty(params, std, low, high, samples)
+
+
+def fit_leastsq(x, y, model, jac, norm, guess, full=False):
     """
     Ajusta um círculo aos dados usando o método dos mínimos quadrados.
 
     :param x: Coordenadas x dos pontos.
     :param y: Coordenadas y dos pontos.
     :param guess: Chute inicial para os parâmetros do círculo.
-    :return: Parâmetros do círculo ajustado.
+    :param full: Se True, retorna também a matriz de covariância dos
+        parâmetros, escalada pela variância dos resíduos (ou None se o
+        problema for singular).
+    :return: Parâmetros do círculo ajustado e resíduos (e a covariância).
     """
-    dim = len(guess)
-    params = guess
-    fit, cov = optimize.leastsq(
+    from scipy import optimize
+
+    fit, cov, *_ = optimize.leastsq(
         lambda p, x, y, model: norm(p, x, y, model),
         guess,
         Dfun=jac,
         args=(x, y, model),
         col_deriv=True,
+        full_output=True,
     )
 
     params = fit
     residuals = norm(fit, x, y, model)
-
-    return params, residuals
+    if not full:
+        return params, residuals
+    if cov is not None:
+        dof = max(residuals.size - len(params), 1)
+        cov = cov * np.sum(residuals**2) / dof
+    return params, residuals, cov
 
 
 def circle_model(params, x, y):
@@ -203,63 +987,80 @@ def circle_model(params, x, y):
     :param y: Coordenadas y dos pontos.
     :return: Distância dos pontos ao círculo.
     """
-    r, cx, cy = params
+    _, cx, cy = params
     return np.sqrt((x - cx) ** 2 + (y - cy) ** 2)
 
 
-def circle_jacobian(params, x, y, model):
+def circle_norm(p, x, y, model):
     """
-    Jacobiano do modelo de círculo.
+    Normaliza os resíduos do ajuste.
 
-    :param params: Parâmetros do círculo (raio, centro_x, centro_y).
+    :param p: Parâmetros do modelo.
     :param x: Coordenadas x dos pontos.
     :param y: Coordenadas y dos pontos.
-    :return: Jacobiano do modelo de círculo.
+    :return: Resíduos normalizados.
     """
-    r, cx, cy = params
-    df = np.empty((len(params), x.size))
-    R = model(params, x, y)
-    df[0] = (cx - x) / R  # dR/dxc
-    df[1] = (cy - y) / R  # dR/dyc
-    df[2] = -1 * np.ones_like(R)  # dR/dr
-    df = df - df.mean(axis=1)[:, np.newaxis]
+    R_1 = model(p, x, y)
+    R_2 = R_1 - R_1.mean()
+    return R_2
 
-    return df
 
+def circle_distance(p, x, y, model):
+    """
+    Distância de cada ponto ao círculo de raio ``p[0]``.
 
-def circle_norm(p, x, y, model):
+    :param p: Parâmetros do círculo (raio, centro_x, centro_y).
+    :param x: Coordenadas x dos pontos.
+    :param y: Coordenadas y dos pontos.
+    :return: Resíduos geométricos.
     """
-    Normaliza os resíduos do ajuste.
+    return model(p, x, y) - p[0]
 
-    :param p: Parâmetros do modelo.
+
+def circle_distance_jacobian(params, x, y, model):
+    """
+    Jacobiano de :func:`circle_distance`, na ordem (raio, centro_x, centro_y).
+
+    :param params: Parâmetros do círculo (raio, centro_x, centro_y).
     :param x: Coordenadas x dos pontos.
     :param y: Coordenadas y dos pontos.
-    :return: Resíduos normalizados.
+    :return: Jacobiano, uma linha por parâmetro.
     """
-    R_1 = model(p, x, y)
-    R_2 = R_1 - R_1.mean()
-    return R_2
+    _, cx, cy = params
+    df = np.empty((len(params), x.size))
+    R = model(params, x, y)
+    df[0] = -1  # d/dr
+    df[1] = (cx - x) / R  # d/dxc
+    df[2] = (cy - y) / R  # d/dyc
+    return df
 
 
-def plot_images(images, titles=None, patches=None, figsize=(16, 10), ax=None):
+def _decimate(image, max_size=None, scale=1):
     """
-    Plota uma lista de imagens.
+    Reduz a imagem por amostragem para no máximo ``max_size`` pixels de lado.
 
-    :param images: Lista de imagens a serem plotadas.
-    :param titles: Lista de títulos para as imagens.
-    :param figsize: Tamanho da figura.
+    :return: Imagem reduzida e ``extent`` em pixels da imagem original, de
+        modo que os patches continuam nas coordenadas originais.
     """
-    n = len(images)
-    if ax is None:
-        fig, axes = plt.subplots(1, n, figsize=figsize)
+    step = 1
+    if max_size is not None:
+        step = max(int(np.ceil(max(image.shape[:2]) / max_size)), 1)
+    image = image[::step, ::step]
+    k = step * scale
+    height, width = image.shape[:2]
+    return image, (-0.5 * k, (width - 0.5) * k, (height - 0.5) * k, -0.5 * k)
+
 
-    if n == 1:
-        axes = [axes]
+def _draw_images(axes, images, titles, patches, max_size=None, scale=1):
+    """Desenha as imagens nos eixos; ``scale`` pode ser um valor por imagem."""
+    from matplotlib_scalebar.scalebar import ScaleBar
 
-    for ax, img, title, patch in zip(axes, images, titles, patches):
+    scales = np.broadcast_to(scale, len(images))
+    for ax, img, title, patch, k in zip(axes, images, titles, patches, scales):
         if not title:
             title = ""
-        ax.imshow(img, cmap="gray")
+        img, extent = _decimate(img, max_size, k)
+        ax.imshow(img, cmap="gray", extent=extent, interpolation="nearest")
         scalebar = ScaleBar(
             1,
             units="px",
@@ -274,5 +1075,126 @@ def plot_images(images, titles=None, patches=None, figsize=(16, 10), ax=None):
                 ax.add_patch(p)
         ax.set_title(title)
         ax.axis("off")
+    return ax
+
+
+def plot_images(
+    images,
+    titles=None,
+    patches=None,
+    figsize=(16, 10),
+    ax=None,
+    max_size=None,
+    scale=1,
+):
+    """
+    Plota uma lista de imagens.
+
+    :param images: Lista de imagens a serem plotadas.
+    :param titles: Lista de títulos para as imagens.
+    :param patches: Lista, por imagem, de patches a desenhar (ou None).
+    :param figsize: Tamanho da figura.
+    :param ax: Eixos em que desenhar, um por imagem; se None, cria a figura.
+    :param max_size: Se informado, as imagens são reduzidas por amostragem
+        para no máximo ``max_size`` pixels de lado antes de desenhar.
+    :param scale: Tamanho, em pixels da imagem original, de um pixel das
+        imagens dadas (por exemplo, o fator de redução do modo pirâmide).
+    :return: Último eixo e figura.
+    """
+    import matplotlib.pyplot as plt
+
+    n = len(images)
+    if ax is None:
+        fig, axes = plt.subplots(1, n, figsize=figsize, squeeze=False)
+    else:
+        axes = np.atleast_1d(ax)
+        fig = axes.flat[0].figure
+    axes = list(np.ravel(axes))
+    titles = titles or [None] * n
+    patches = patches or [None] * n
 
+    ax = _draw_images(axes, images, titles, patches, max_size, scale)
     return ax, fig
+
+
+_preview_executor = None
+
+
+def _render_preview(path, images, titles, circles, scales, figsize, dpi):
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Circle
+
+    n = len(images)
+    fig = Figure(figsize=figsize, dpi=dpi)
+    axes = fig.subplots(1, n, squeeze=False)[0]
+    colors = ["red", "cyan", "yellow", "lime"]
+    patches = [
+        [
+            Circle(
+                (param[1], param[2]),
+                radius=param[0],
+                color=colors[i % len(colors)],
+                fill=False,
+            )
+            for i, param in enumerate(circles)
+        ]
+        for _ in range(n)
+    ]
+    _draw_images(axes, images, titles or [None] * n, patches, scale=scales)
+    fig.savefig(path, bbox_inches="tight")
+    return Path(path)
+
+
+def save_preview(
+    path,
+    images,
+    titles=None,
+    circles=(),
+    max_size=800,
+    scale=1,
+    figsize=(16, 5),
+    dpi=100,
+    background=False,
+):
+    """
+    Grava uma imagem de diagnóstico sem interface gráfica.
+
+    As imagens são reduzidas por amostragem para no máximo ``max_size``
+    pixels de lado e desenhadas numa :class:`matplotlib.figure.Figure`
+    com o backend Agg, sem passar pelo ``pyplot``. Os círculos
+    ``(raio, centro_x, centro_y)`` são desenhados em todos os painéis.
+
+    :param path: Arquivo de saída (o formato vem da extensão).
+    :param images: Lista de imagens.
+    :param titles: Lista de títulos.
+    :param circles: Parâmetros dos círculos, em pixels da imagem original.
+    :param max_size: Lado máximo das imagens desenhadas.
+    :param scale: Tamanho, em pixels da imagem original, de um pixel das
+        imagens dadas.
+    :param background: Se True, a figura é gravada por uma thread em
+        segundo plano e a função retorna um ``Future``; use
+        :func:`wait_previews` para esperar todas as gravações.
+    :return: Caminho do arquivo, ou ``Future`` com o caminho.
+    """
+    global _preview_executor
+
+    # Reduz já na thread de quem chama, para não guardar as imagens inteiras.
+    reduced, scales = [], []
+    for image in images:
+        image = np.asarray(image)
+        small, extent = _decimate(image, max_size, scale)
+        reduced.append(np.array(small))
+        scales.append((extent[1] - extent[0]) / small.shape[1])
+    circles = [np.asarray(circle) for circle in circles]
+    args = (path, reduced, titles, circles, scales, figsize, dpi)
+    if not background:
+        return _render_preview(*args)
+    if _preview_executor is None:
+        _preview_executor = ThreadPoolExecutor(max_workers=1)
+    return _preview_executor.submit(_render_preview, *args)
+
+
+def wait_previews():
+    """Espera as gravações de :func:`save_preview` em segundo plano."""
+    if _preview_executor is not None:
+        _preview_executor.submit(lambda: None).result()
@@ -1,26 +1,52 @@
-import matplotlib.dates as mdates
-import osmnx as ox
-import pandas as pd
-import pyvista as pv
-from matplotlib import pyplot as plt
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
-from astroufcg.astronomy import get_noon_times, obseve_shadow, setup
+import numpy as np
+import pandas as pd
 
-path = "../../../"
-setup(path)
+from ..astronomy import (
+    find_minimum_shadows,
+    find_summer_noon_times,
+    get_noon_times_batch,
+    obseve_shadow,
+    setup,  # noqa: F401 (reexportado para os notebooks)
+    shadow_length,
+    solar_altitudes,
+)
+from ..ephemeris import default_ephemeris, get_timescale
+from ..geocoding import geocode
+
+
+def _geodesic_arcs(lat_01, lon_01, lat_02, lon_02):
+    """
+    Distâncias no elipsoide WGS84, sem supor o raio da Terra.
+
+    :return: Distância geodésica entre os locais e arco norte-sul (ao longo
+        do meridiano do primeiro local), em km.
+    """
+    from geopy.distance import geodesic
+
+    distance = np.array(
+        [
+            geodesic((a, b), (c, d)).km
+            for a, b, c, d in zip(lat_01, lon_01, lat_02, lon_02)
+        ]
+    )
+    meridian = np.array(
+        [geodesic((a, b), (c, b)).km for a, b, c in zip(lat_01, lon_01, lat_02)]
+    )
+    return distance, meridian
 
 
 def set_experiment(site_01, site_02, year=2023, object_height=10):
     """Configura o experimento de Eratóstenes para dois locais."""
-    location_01 = pd.DataFrame(
-        [list(ox.geocode(site_01))], columns=["lat", "lon"]
-    ).iloc[0]
-    location_02 = pd.DataFrame(
-        [list(ox.geocode(site_02))], columns=["lat", "lon"]
-    ).iloc[0]
+    location_01 = pd.DataFrame([list(geocode(site_01))], columns=["lat", "lon"]).iloc[0]
+    location_02 = pd.DataFrame([list(geocode(site_02))], columns=["lat", "lon"]).iloc[0]
 
-    noon_01, times_01 = get_noon_times(location_01, year)
-    noon_02, times_02 = get_noon_times(location_02, year)
+    (noon_01, times_01), (noon_02, times_02) = get_noon_times_batch(
+        [location_01, location_02], year
+    )
 
     df_01 = obseve_shadow(location_01, times_02, object_height)
     df_02 = obseve_shadow(location_02, times_02, object_height)
@@ -39,21 +65,209 @@ def set_experiment(site_01, site_02, year=2023, object_height=10):
         index=times_02.ut1,
     )
 
+    # Sombra mínima de cada local, resolvida diretamente (sem depender da
+    # grade de um minuto), e a sombra do local 01 nesse instante do local 02
+    minima = find_minimum_shadows(
+        [location_01["lat"], location_02["lat"]],
+        [location_01["lon"], location_02["lon"]],
+        [year],
+        object_height,
+    )
+    t_min = get_timescale().tt_jd(minima["min_shadow_tt"].to_numpy())
+    alt_01 = solar_altitudes(
+        np.array([location_01["lat"]], dtype=float),
+        np.array([location_01["lon"]], dtype=float),
+        minima["min_shadow_tt"].to_numpy()[1:],
+        default_ephemeris(),
+    )
+    df.attrs["min_shadow"] = minima["min_shadow"].tolist()
+    df.attrs["time_min_shadow"] = list(
+        pd.to_datetime(t_min.ut1_strftime("%H:%M:%S"), format="%H:%M:%S")
+    )
+    df.attrs["shadow_01_at_min_02"] = float(shadow_length(object_height, alt_01[0]))
+
     return df
 
 
+def _geocode_sites(pairs):
+    """Resolve as coordenadas de cada local distinto apenas uma vez."""
+    sites = pd.unique(pairs[["site_01", "site_02"]].to_numpy().ravel())
+    return {site: geocode(site) for site in sites}
+
+
+def _run_chunk(chunk, object_height=10, ephem=None):
+    """
+    Executa o experimento para um bloco de pares de locais.
+
+    O meio-dia de todos os locais do bloco é resolvido por uma única chamada
+    a :func:`find_summer_noon_times`, e as alturas do Sol nesses instantes
+    por uma única avaliação vetorizada do Skyfield.
+    """
+    from skyfield.api import wgs84
+
+    ephem = ephem or default_ephemeris()
+    rows = len(chunk)
+    lat = np.concatenate([chunk["lat_01"], chunk["lat_02"]]).astype(float)
+    lon = np.concatenate([chunk["lon_01"], chunk["lon_02"]]).astype(float)
+    year = np.tile(chunk["year"].to_numpy(dtype=int), 2)
+
+    noons = _noons_by_year(lat, lon, year, ephem)
+    observer = ephem.terra + wgs84.latlon(latitude_degrees=lat, longitude_degrees=lon)
+    t = ephem.ts.tt_jd(noons["noon_tt"].to_numpy())
+    alt, az, _ = observer.at(t).observe(ephem.sol).apparent().altaz()
+    alt = alt.degrees
+
+    # Eratóstenes: a diferença das distâncias zenitais do Sol ao meio-dia é o
+    # ângulo entre os locais, e a distância norte-sul entre eles o arco
+    # correspondente. A distância zenital é positiva com o Sol ao sul do
+    # zênite e negativa ao norte, para que pares em lados opostos da
+    # latitude subsolar somem os ângulos em vez de subtraí-los.
+    # O arco vem da coluna ``distance_km``, se informada (por exemplo, os
+    # 5000 estádios de Eratóstenes), ou do elipsoide WGS84; nunca de um raio
+    # suposto, que tornaria a estimativa circular.
+    alt_01, alt_02 = alt[:rows], alt[rows:]
+    distance, meridian = _geodesic_arcs(lat[:rows], lon[:rows], lat[rows:], lon[rows:])
+    if "distance_km" in chunk:
+        given = chunk["distance_km"].to_numpy(dtype=float)
+        meridian = np.where(np.isnan(given), meridian, given)
+    zenith = np.where(np.cos(az.radians) < 0, 1.0, -1.0) * (90.0 - alt)
+    angle = np.radians(np.abs(zenith[:rows] - zenith[rows:]))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        radius = np.where(angle > 0, meridian / angle, np.nan)
+
+    result = chunk.reset_index(drop=True).copy()
+    result["noon_01_ut1"] = noons["noon_ut1"].to_numpy()[:rows]
+    result["noon_02_ut1"] = noons["noon_ut1"].to_numpy()[rows:]
+    result["alt_01"] = alt_01
+    result["alt_02"] = alt_02
+    result["shadow_length_01"] = shadow_length(object_height, alt_01)
+    result["shadow_length_02"] = shadow_length(object_height, alt_02)
+    result["geodesic_km"] = distance
+    result["meridian_km"] = meridian
+    result["radius_km"] = radius
+    return result
+
+
+def _noons_by_year(lat, lon, year, ephem):
+    """Meio-dia de cada par (local, ano), na ordem das entradas."""
+    frames = []
+    order = []
+    for value in np.unique(year):
+        idx = np.flatnonzero(year == value)
+        frames.append(find_summer_noon_times(lat[idx], lon[idx], [value], ephem=ephem))
+        order.append(idx)
+    noons = pd.concat(frames, ignore_index=True)
+    return noons.iloc[np.argsort(np.concatenate(order))].reset_index(drop=True)
+
+
+def run_experiments(
+    pairs,
+    output=None,
+    object_height=10,
+    workers=None,
+    chunk_size=256,
+    ephem=None,
+):
+    """
+    Executa o experimento de Eratóstenes para muitos pares de locais e anos.
+
+    Cada linha de ``pairs`` é um experimento. Os locais são geocodificados
+    uma única vez no processo principal (a menos que já venham as colunas
+    ``lat_01``, ``lon_01``, ``lat_02`` e ``lon_02``), e as linhas são
+    distribuídas em blocos entre processos. A efeméride é enviada aos
+    processos apenas pelo caminho do arquivo: cada um a abre uma vez,
+    mapeada em memória, e todos compartilham o cache persistente de
+    resultados.
+
+    :param pairs: DataFrame com as colunas ``site_01``, ``site_02`` e
+        ``year``, ou com as coordenadas dos dois locais. Uma coluna
+        opcional ``distance_km`` dá o arco norte-sul medido entre os
+        locais; onde falta, o arco é calculado no elipsoide WGS84.
+    :param output: Arquivo Parquet de saída. Se informado, os blocos são
+        gravados à medida que ficam prontos.
+    :param object_height: Altura do gnômon em metros.
+    :param workers: Número de processos; 1 executa no processo atual.
+    :param chunk_size: Número de pares por bloco.
+    :param ephem: Contexto de efeméride; se None, usa o padrão.
+    :return: DataFrame com os resultados ou, se ``output`` for informado, o
+        caminho do arquivo. A coluna ``radius_km`` é a estimativa do raio
+        da Terra obtida pelo par: ``meridian_km`` dividido pela diferença
+        das distâncias zenitais do Sol; ``geodesic_km`` é a distância entre
+        os locais.
+    """
+    ephem = ephem or default_ephemeris()
+    pairs = pd.DataFrame(pairs).reset_index(drop=True)
+    if "year" not in pairs:
+        pairs["year"] = 2023
+    coordinates = ["lat_01", "lon_01", "lat_02", "lon_02"]
+    if not set(coordinates).issubset(pairs.columns):
+        located = _geocode_sites(pairs)
+        for prefix in ("01", "02"):
+            points = pairs[f"site_{prefix}"].map(located)
+            pairs[f"lat_{prefix}"] = [point[0] for point in points]
+            pairs[f"lon_{prefix}"] = [point[1] for point in points]
+
+    chunks = [
+        pairs.iloc[start : start + chunk_size]
+        for start in range(0, len(pairs), chunk_size)
+    ]
+    workers = workers or min(len(chunks), os.cpu_count() or 1)
+
+    writer = None
+    executor = None
+    frames = []
+    try:
+        if workers <= 1:
+            results = (_run_chunk(chunk, object_height, ephem) for chunk in chunks)
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            results = executor.map(
+                _run_chunk,
+                chunks,
+                [object_height] * len(chunks),
+                [ephem] * len(chunks),
+            )
+        for result in results:
+            if output is None:
+                frames.append(result)
+                continue
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(result, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(Path(output), table.schema)
+            writer.write_table(table)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if writer is not None:
+            writer.close()
+
+    if output is not None:
+        return Path(output)
+    return pd.concat(frames, ignore_index=True) if frames else pairs
+
+
 def view_shadow_length(df):
     """Visualiza as sombras projetadas em um gráfico."""
+    import matplotlib.dates as mdates
+    from matplotlib import pyplot as plt
+
     colors = ["orange", "slateblue"]
     formato_hora = mdates.DateFormatter("%H:%M")
 
     fig, ax = plt.subplots(figsize=(10, 6))
     for prefix in ["01", "02"]:
         idx = int(prefix) - 1
-        min_shadow = df[f"shadow_length_{prefix}"].min()
-        t_min_shadow = df["time_02"].iloc[
-            df.reset_index()[f"shadow_length_{prefix}"].idxmin()
-        ]  # .strftime("%H:%M")
+        if "min_shadow" in df.attrs:
+            min_shadow = df.attrs["min_shadow"][idx]
+            t_min_shadow = df.attrs["time_min_shadow"][idx]
+        else:
+            min_shadow = df[f"shadow_length_{prefix}"].min()
+            t_min_shadow = df["time_02"].iloc[
+                df.reset_index()[f"shadow_length_{prefix}"].idxmin()
+            ]  # .strftime("%H:%M")
         ax.axhline(
             y=min_shadow,
             color=colors[idx],
@@ -73,7 +287,9 @@ def view_shadow_length(df):
             color=colors[idx],
         )
 
-        if prefix == "02":
+        if prefix == "02" and "shadow_01_at_min_02" in df.attrs:
+            shadow_01 = [df.attrs["shadow_01_at_min_02"]]
+        elif prefix == "02":
             shadow_01 = df[
                 df.time_02.dt.strftime("%H:%M") == t_min_shadow.strftime("%H:%M")
             ]["shadow_length_01"].values
@@ -98,6 +314,8 @@ def view_shadow_length(df):
 
 def _make_scene(plotter, actors, title, alt, az, position):
     """Create a scene with a light source and a title."""
+    import pyvista as pv
+
     sun_color = "lightyellow"  # Using a named color for simplicity
     plotter.add_text(title, position=position, font_size=16, color="maroon")
     sun_color = "lightyellow"  # Using a named color for simplicity
@@ -134,6 +352,8 @@ def _make_scene(plotter, actors, title, alt, az, position):
 
 
 def view_shadow_3D(site, df, prefix="01", year=-200, object_height=10, p=None):
+    import pyvista as pv
+
     sun_color = "lightyellow"  # Using a named color for simplicity
     alt = df[f"alt_{prefix}"].values
     az = df[f"az_{prefix}"].values
@@ -211,6 +431,8 @@ def animate_shadow_3D(
     object_height=10,
     filename="../../../content/00_images/cap_01/shadow.gif",
 ):
+    import pyvista as pv
+
     sun_color = "lightyellow"
     alt = df[f"alt_{prefix}"].values
     az = df[f"az_{prefix}"].values
@@ -0,0 +1,226 @@
+"""Sombras de um gnômon em grades de locais e instantes."""
+
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from .astronomy import NEWTON_MAX_ITER, NEWTON_TOL, shadow_length
+from .ephemeris import default_ephemeris
+
+
+class ShadowField(NamedTuple):
+    """Geometria da sombra, com um array ``(n_locais, n_instantes)`` por campo."""
+
+    alt: np.ndarray
+    az: np.ndarray
+    length: np.ndarray
+    direction: np.ndarray
+
+
+def solar_directions(times, ephem=None):
+    """
+    Direção aparente geocêntrica do Sol no referencial terrestre (ITRS).
+
+    A posição aparente no GCRS vem do avaliador de Chebyshev (ver
+    :meth:`ChebyshevKernel.apparent`), que percorre todo o vetor de
+    instantes sem criar objetos do Skyfield; só a rotação para o ITRS
+    passa pelo Skyfield.
+
+    :param times: Instantes do Skyfield.
+    :param ephem: Contexto de efeméride; se None, usa o padrão.
+    :return: Array ``(3, n_instantes)`` de vetores unitários.
+    """
+    from skyfield.framelib import itrs
+
+    ephem = ephem or default_ephemeris()
+    gcrs = ephem.chebyshev.apparent("sun", "earth", times)
+    rotation = np.reshape(itrs.rotation_at(times), (3, 3, -1))
+    xyz = np.einsum("ijn,jn->in", rotation, gcrs)
+    return xyz / np.linalg.norm(xyz, axis=0)
+
+
+def local_axes(lats, lons):
+    """
+    Eixos leste, norte e zênite de cada local, no referencial terrestre.
+
+    :param lats: Latitudes geodésicas em graus.
+    :param lons: Longitudes em graus.
+    :return: Três arrays ``(n_locais, 3)``.
+    """
+    lat = np.radians(np.ravel(lats))
+    lon = np.radians(np.ravel(lons))
+    sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+    sin_lon, cos_lon = np.sin(lon), np.cos(lon)
+    east = np.column_stack([-sin_lon, cos_lon, np.zeros_like(lon)])
+    north = np.column_stack([-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat])
+    up = np.column_stack([cos_lat * cos_lon, cos_lat * sin_lon, sin_lat])
+    return east, north, up
+
+
+class ShadowEngine:
+    """
+    Calcula sombras para muitos locais sobre uma grade fixa de instantes.
+
+    A posição aparente do Sol é obtida do Skyfield uma única vez por grade;
+    para cada local basta projetar essa direção nos eixos locais, o que
+    reduz o cálculo a produtos de matrizes do NumPy. A paralaxe do Sol
+    (menos de 9") e a refração são desprezadas.
+
+    :param times: Instantes do Skyfield.
+    :param ephem: Contexto de efeméride; se None, usa o padrão.
+    """
+
+    def __init__(self, times, ephem=None):
+        self.times = times
+        self.sun = solar_directions(times, ephem)
+
+    def __repr__(self):
+        return f"ShadowEngine({self.sun.shape[1]} instantes)"
+
+    def evaluate(self, lats, lons, object_height=10, dtype=np.float64):
+        """
+        Geometria da sombra de um gnômon em cada local e instante.
+
+        :param lats: Latitudes dos locais em graus.
+        :param lons: Longitudes dos locais em graus.
+        :param object_height: Altura do gnômon em metros.
+        :param dtype: Tipo dos arrays de saída; ``np.float32`` reduz a
+            memória pela metade.
+        :return: :class:`ShadowField` com altura e azimute do Sol, comprimento
+            da sombra e azimute para onde ela aponta, em graus e metros. Com
+            o Sol abaixo do horizonte, comprimento e direção são NaN.
+        """
+        east, north, up = (axis.astype(dtype) for axis in local_axes(lats, lons))
+        sun = self.sun.astype(dtype)
+        alt = np.degrees(np.arcsin(np.clip(up @ sun, -1, 1)))
+        az = np.degrees(np.arctan2(east @ sun, north @ sun)) % 360
+        with np.errstate(divide="ignore", invalid="ignore"):
+            day = alt > 0
+            length = np.where(day, object_height / np.tan(np.radians(alt)), np.nan)
+            direction = np.where(day, (az + 180) % 360, np.nan)
+        return ShadowField(
+            alt.astype(dtype, copy=False),
+            az.astype(dtype, copy=False),
+            length.astype(dtype, copy=False),
+            direction.astype(dtype, copy=False),
+        )
+
+
+def noon_times(lons, year, month, day, ephem=None):
+    """
+    Instante da passagem meridiana do Sol em cada longitude, em um dia.
+
+    Resolve, pelo método de Newton e para todas as longitudes de uma vez, o
+    instante em que a longitude terrestre da direção do Sol coincide com a
+    do local.
+
+    :param lons: Longitudes em graus.
+    :param year: Ano (pode ser negativo, em notação astronômica).
+    :param month: Mês.
+    :param day: Dia (UT1).
+    :param ephem: Contexto de efeméride; se None, usa o padrão.
+    :return: Instantes do Skyfield e direções ``(3, n_longitudes)`` do Sol
+        nesses instantes.
+    """
+    ephem = ephem or default_ephemeris()
+    ts = ephem.ts
+    lons = np.ravel(np.asarray(lons, dtype=float))
+    jd = ts.ut1(year, month, day).ut1 + 0.5 - lons / 360.0
+    for _ in range(NEWTON_MAX_ITER):
+        t = ts.ut1_jd(jd)
+        sun = solar_directions(t, ephem)
+        sun_lon = np.degrees(np.arctan2(sun[1], sun[0]))
+        step = ((sun_lon - lons + 180.0) % 360.0 - 180.0) / 360.0
+        jd = jd + step
+        if np.max(np.abs(step)) < NEWTON_TOL:
+            break
+    t = ts.ut1_jd(jd)
+    return t, solar_directions(t, ephem)
+
+
+def _open_output(output, name, shape, chunks, dtype, format):
+    if output is None:
+        return np.empty(shape, dtype=dtype)
+    if format == "npy":
+        return np.lib.format.open_memmap(
+            output / f"{name}.npy", mode="w+", dtype=dtype, shape=shape
+        )
+    if format == "zarr":
+        import zarr
+
+        return zarr.open_array(
+            (output / f"{name}.zarr").as_posix(),
+            mode="w",
+            shape=shape,
+            chunks=chunks,
+            dtype=dtype,
+        )
+    raise ValueError(f"Formato desconhecido: {format!r} (use 'npy' ou 'zarr').")
+
+
+def noon_shadow_raster(
+    year,
+    month,
+    day,
+    resolution=0.1,
+    output=None,
+    object_height=10,
+    chunk_rows=256,
+    dtype=np.float32,
+    format="npy",
+    ephem=None,
+):
+    """
+    Mapa global da altura do Sol e da sombra ao meio-dia solar de um dia.
+
+    A passagem meridiana é resolvida uma vez por longitude; as linhas de
+    latitude são então preenchidas em blocos de ``chunk_rows``, de modo que
+    a memória usada não depende do tamanho da grade quando a saída vai para
+    disco.
+
+    :param year: Ano (pode ser negativo, em notação astronômica).
+    :param month: Mês.
+    :param day: Dia (UT1).
+    :param resolution: Espaçamento da grade em graus.
+    :param output: Diretório de saída. Se None, os arrays ficam em memória.
+    :param object_height: Altura do gnômon em metros.
+    :param chunk_rows: Número de linhas de latitude por bloco.
+    :param dtype: Tipo dos arrays de saída.
+    :param format: ``"npy"`` (arquivos mapeados em memória) ou ``"zarr"``.
+    :param ephem: Contexto de efeméride; se None, usa o padrão.
+    :return: Dicionário com ``lat``, ``lon``, ``alt`` e ``shadow_length``;
+        os dois últimos são arrays ``(n_lat, n_lon)`` com a latitude
+        decrescente ao longo das linhas. A sombra é NaN onde o Sol não
+        nasce.
+    """
+    lat = 90 - resolution * (np.arange(round(180 / resolution)) + 0.5)
+    lon = -180 + resolution * (np.arange(round(360 / resolution)) + 0.5)
+    shape = (lat.size, lon.size)
+    chunks = (chunk_rows, lon.size)
+    if output is not None:
+        output = Path(output)
+        output.mkdir(parents=True, exist_ok=True)
+        np.save(output / "lat.npy", lat)
+        np.save(output / "lon.npy", lon)
+    alt_out = _open_output(output, "alt", shape, chunks, dtype, format)
+    shadow_out = _open_output(output, "shadow_length", shape, chunks, dtype, format)
+
+    _, sun = noon_times(lon, year, month, day, ephem)
+    # Componente horizontal (no plano do equador) do Sol ao longo do meridiano
+    cos_lon, sin_lon = np.cos(np.radians(lon)), np.sin(np.radians(lon))
+    sun_meridian = (cos_lon * sun[0] + sin_lon * sun[1]).astype(dtype)
+    sun_z = sun[2].astype(dtype)
+    for start in range(0, lat.size, chunk_rows):
+        rows = np.radians(lat[start : start + chunk_rows]).astype(dtype)[:, None]
+        sin_alt = np.cos(rows) * sun_meridian + np.sin(rows) * sun_z
+        alt = np.degrees(np.arcsin(np.clip(sin_alt, -1, 1)))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shadow = np.where(alt > 0, shadow_length(object_height, alt), np.nan)
+        alt_out[start : start + chunk_rows] = alt
+        shadow_out[start : start + chunk_rows] = shadow
+
+    if output is not None and format == "npy":
+        alt_out.flush()
+        shadow_out.flush()
+    return {"lat": lat, "lon": lon, "alt": alt_out, "shadow_length": shadow_out}
@@ -1,17 +1,23 @@
-import holoviews as hv
+from functools import lru_cache
+
 import numpy as np
 import pandas as pd
-import panel as pn
-from bokeh.models import HoverTool
-from holoviews.plotting.util import hex2rgb, process_cmap
-from PIL import Image
 
-hv.extension("bokeh")
-pn.extension()
+
+@lru_cache(maxsize=1)
+def _load_extensions():
+    """Inicializa as extensões do holoviews e do panel uma única vez."""
+    import holoviews as hv
+    import panel as pn
+
+    hv.extension("bokeh")
+    pn.extension()
 
 
 # Utility functions for color manipulation
 def get_luminance(color):
+    from holoviews.plotting.util import hex2rgb
+
     R, G, B = hex2rgb(color)
     r, g, b = [c / 255 for c in (R, G, B)]
     r_lin = r / 12.92 if r <= 0.03928 else ((r + 0.055) / 1.055) ** 2.4
@@ -43,6 +49,13 @@ def build_timeline(
     pad=0.5,
     bgcolor="aliceblue",
 ):
+    import holoviews as hv
+    from bokeh.models import HoverTool
+    from holoviews.plotting.util import process_cmap
+    from PIL import Image
+
+    _load_extensions()
+
     # 📊 Configurações iniciais
     df = df.copy()
     df = df.apply(lambda x: x.str.strip() if x.dtype == "object" else x)